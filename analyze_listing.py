@@ -1,5 +1,10 @@
+import sys
+import json
 import time
+import queue
 import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -15,123 +20,247 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def analyze_listing_page(url):
+def setup_driver():
+    """Create a Chrome driver for loading listing pages"""
+    options = Options()
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+
+    # Add user agent
+    options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
+
+    return webdriver.Chrome(options=options)
+
+def fetch_listing_html(driver, url):
+    """Load a listing page and return its HTML once the main content is present"""
+    logger.info(f"Loading page: {url}")
+    driver.get(url)
+
+    # Wait for content to load
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "object-primary"))
+    )
+
+    return driver.page_source
+
+def parse_listing_html(html, log_fields=True):
+    """Extract the listing fields from a listing page's HTML"""
+    # Per-field output is only wanted when inspecting a single page
+    log = logger.info if log_fields else logger.debug
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Initialize data dictionary
+    listing_data = {}
+
+    # 1. Basic Information
+    log("\n=== BASIC INFORMATION ===")
+    header = soup.find("div", class_="object-header__content")
+    if header:
+        # Title and Location
+        title_div = header.find("h1")
+        if title_div:
+            title = title_div.find("span", class_="object-header__title")
+            subtitle = title_div.find("span", class_="object-header__subtitle")
+            if title:
+                listing_data['title'] = title.text.strip()
+                log(f"Title: {title.text.strip()}")
+            if subtitle:
+                listing_data['location'] = subtitle.text.strip()
+                log(f"Location: {subtitle.text.strip()}")
+
+        # Price
+        price_div = header.find("div", class_="object-header__pricing")
+        if price_div:
+            price = price_div.find("strong", class_="object-header__price")
+            if price:
+                listing_data['price'] = price.text.strip()
+                log(f"Price: {price.text.strip()}")
+
+    # 2. Description
+    log("\n=== DESCRIPTION ===")
+    description_section = soup.find("section", class_="object-description")
+    if description_section:
+        description_body = description_section.find("div", class_="object-description-body")
+        if description_body:
+            listing_data['description'] = description_body.text.strip()
+            log(f"Description: {description_body.text.strip()}")
+
+    # 3. Property Characteristics
+    log("\n=== PROPERTY CHARACTERISTICS ===")
+    kenmerken_body = soup.find("div", class_="object-kenmerken-body")
+    if kenmerken_body:
+        current_section = None
+        for element in kenmerken_body.children:
+            if element.name == 'h3':
+                current_section = element.text.strip()
+                log(f"\n--- {current_section} ---")
+            elif element.name == 'dl':
+                # Process the definition list
+                for dt, dd in zip(element.find_all('dt'), element.find_all('dd')):
+                    label = dt.text.strip()
+                    value = dd.text.strip()
+
+                    # Clean up the value (remove extra whitespace and newlines)
+                    value = ' '.join(value.split())
+
+                    # Store in listing_data with section prefix
+                    if current_section:
+                        key = f"{current_section}_{label}"
+                    else:
+                        key = label
+                    listing_data[key] = value
+
+                    log(f"{label}: {value}")
+
+                    # Special handling for kadastrale gegevens
+                    if current_section == "Kadastrale gegevens":
+                        kadaster_title = dt.find("div", class_="kadaster-title")
+                        if kadaster_title:
+                            listing_data['kadaster_title'] = kadaster_title.text.strip()
+                            log(f"Kadaster Title: {kadaster_title.text.strip()}")
+
+    # Print all collected data
+    log("\n=== COLLECTED DATA ===")
+    for key, value in listing_data.items():
+        log(f"{key}: {value}")
+
+    return listing_data
+
+def _parse_timed(url, html, log_fields):
+    """Parse in a worker process and report how long it took"""
+    start = time.perf_counter()
+    data = parse_listing_html(html, log_fields=log_fields)
+    return url, data, time.perf_counter() - start
+
+def analyze_listing_page(url, driver=None, log_fields=True):
     """Analyze the structure of a Funda listing page"""
+    own_driver = driver is None
     try:
-        # Setup Chrome options
-        options = Options()
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
-        
-        # Add user agent
-        options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
-        
-        # Initialize driver
-        driver = webdriver.Chrome(options=options)
-        
-        try:
-            # Load the page
-            logger.info(f"Loading page: {url}")
-            driver.get(url)
-            
-            # Wait for content to load
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "object-primary"))
-            )
-            
-            # Get page content
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            
-            # Initialize data dictionary
-            listing_data = {}
-            
-            # 1. Basic Information
-            logger.info("\n=== BASIC INFORMATION ===")
-            header = soup.find("div", class_="object-header__content")
-            if header:
-                # Title and Location
-                title_div = header.find("h1")
-                if title_div:
-                    title = title_div.find("span", class_="object-header__title")
-                    subtitle = title_div.find("span", class_="object-header__subtitle")
-                    if title:
-                        listing_data['title'] = title.text.strip()
-                        logger.info(f"Title: {title.text.strip()}")
-                    if subtitle:
-                        listing_data['location'] = subtitle.text.strip()
-                        logger.info(f"Location: {subtitle.text.strip()}")
-                
-                # Price
-                price_div = header.find("div", class_="object-header__pricing")
-                if price_div:
-                    price = price_div.find("strong", class_="object-header__price")
-                    if price:
-                        listing_data['price'] = price.text.strip()
-                        logger.info(f"Price: {price.text.strip()}")
-            
-            # 2. Description
-            logger.info("\n=== DESCRIPTION ===")
-            description_section = soup.find("section", class_="object-description")
-            if description_section:
-                description_body = description_section.find("div", class_="object-description-body")
-                if description_body:
-                    listing_data['description'] = description_body.text.strip()
-                    logger.info(f"Description: {description_body.text.strip()}")
-            
-            # 3. Property Characteristics
-            logger.info("\n=== PROPERTY CHARACTERISTICS ===")
-            kenmerken_body = soup.find("div", class_="object-kenmerken-body")
-            if kenmerken_body:
-                current_section = None
-                for element in kenmerken_body.children:
-                    if element.name == 'h3':
-                        current_section = element.text.strip()
-                        logger.info(f"\n--- {current_section} ---")
-                    elif element.name == 'dl':
-                        # Process the definition list
-                        for dt, dd in zip(element.find_all('dt'), element.find_all('dd')):
-                            label = dt.text.strip()
-                            value = dd.text.strip()
-                            
-                            # Clean up the value (remove extra whitespace and newlines)
-                            value = ' '.join(value.split())
-                            
-                            # Store in listing_data with section prefix
-                            if current_section:
-                                key = f"{current_section}_{label}"
-                            else:
-                                key = label
-                            listing_data[key] = value
-                            
-                            logger.info(f"{label}: {value}")
-                            
-                            # Special handling for kadastrale gegevens
-                            if current_section == "Kadastrale gegevens":
-                                kadaster_title = dt.find("div", class_="kadaster-title")
-                                if kadaster_title:
-                                    listing_data['kadaster_title'] = kadaster_title.text.strip()
-                                    logger.info(f"Kadaster Title: {kadaster_title.text.strip()}")
-            
-            # Print all collected data
-            logger.info("\n=== COLLECTED DATA ===")
-            for key, value in listing_data.items():
-                logger.info(f"{key}: {value}")
-            
-            return listing_data
-            
-        finally:
-            driver.quit()
-            
+        if own_driver:
+            driver = setup_driver()
+
+        return parse_listing_html(fetch_listing_html(driver, url), log_fields=log_fields)
+
     except Exception as e:
         logger.error(f"Error analyzing page: {str(e)}")
-        if 'driver' in locals():
-            driver.quit()
         return None
 
+    finally:
+        if own_driver and driver is not None:
+            driver.quit()
+
+def analyze_listings(urls, output, n_drivers=1, n_workers=None, log_fields=False):
+    """
+    Analyze many listing pages and stream one JSON object per URL to `output`.
+
+    A pool of n_drivers Chrome instances is shared across all URLs; parsing runs in
+    n_workers processes so the browsers keep loading pages meanwhile. Each line holds
+    the url, the fields (or the error) and fetch/parse timings in seconds.
+    Returns the number of URLs that were analyzed successfully.
+    """
+    drivers = queue.Queue()
+    succeeded = 0
+
+    def fetch(url):
+        driver = drivers.get()
+        start = time.perf_counter()
+        try:
+            return url, fetch_listing_html(driver, url), None, time.perf_counter() - start
+        except TimeoutException:
+            return url, None, "timeout waiting for listing page", time.perf_counter() - start
+        except Exception as e:
+            return url, None, str(e), time.perf_counter() - start
+        finally:
+            drivers.put(driver)
+
+    def write(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    try:
+        for _ in range(n_drivers):
+            drivers.put(setup_driver())
+
+        with ThreadPoolExecutor(max_workers=n_drivers) as fetch_pool, \
+                ProcessPoolExecutor(max_workers=n_workers) as parse_pool:
+            fetch_times = {}
+            # parse future -> url, so a failed parse can still be reported for its URL
+            pending = {}
+
+            def write_parsed(futures):
+                nonlocal succeeded
+                for parse_future in futures:
+                    url = pending.pop(parse_future)
+                    try:
+                        url, data, parse_seconds = parse_future.result()
+                    except Exception as e:
+                        logger.error(f"Error parsing page {url}: {str(e)}")
+                        write({"url": url, "error": str(e), "fetch_seconds": round(fetch_times[url], 3)})
+                        continue
+
+                    write({
+                        "url": url,
+                        "data": data,
+                        "fetch_seconds": round(fetch_times[url], 3),
+                        "parse_seconds": round(parse_seconds, 3),
+                    })
+                    succeeded += 1
+
+            for fetch_future in as_completed([fetch_pool.submit(fetch, url) for url in urls]):
+                url, html, error, fetch_seconds = fetch_future.result()
+                if error:
+                    logger.error(f"Error analyzing page {url}: {error}")
+                    write({"url": url, "error": error, "fetch_seconds": round(fetch_seconds, 3)})
+                else:
+                    fetch_times[url] = fetch_seconds
+                    pending[parse_pool.submit(_parse_timed, url, html, log_fields)] = url
+
+                # Stream whatever the workers have finished so far
+                write_parsed([future for future in list(pending) if future.done()])
+
+            write_parsed(list(as_completed(pending)))
+
+    finally:
+        while not drivers.empty():
+            drivers.get().quit()
+
+    return succeeded
+
+def read_urls(lines):
+    """Non-empty, non-comment lines, without duplicates"""
+    urls = (line.strip() for line in lines)
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith('#')))
+
 if __name__ == "__main__":
-    # Test URL
-    test_url = "https://www.fundainbusiness.nl/agrarische-grond/heythuysen/object-89102295-arenbos/"
-    analyze_listing_page(test_url) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Analyze Funda listing pages")
+    parser.add_argument('input', nargs='?', help="file with one listing URL per line, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="JSON Lines output file (default: stdout)")
+    parser.add_argument('--drivers', type=int, default=1, help="number of Chrome instances to share")
+    parser.add_argument('--workers', type=int, default=None, help="number of parser processes")
+    parser.add_argument('--log-fields', action='store_true', help="log every extracted field")
+    args = parser.parse_args()
+
+    if args.input is None:
+        # Test URL
+        test_url = "https://www.fundainbusiness.nl/agrarische-grond/heythuysen/object-89102295-arenbos/"
+        analyze_listing_page(test_url)
+        sys.exit(0)
+
+    if args.input == '-':
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            urls = read_urls(f)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    try:
+        count = analyze_listings(urls, out, n_drivers=args.drivers, n_workers=args.workers, log_fields=args.log_fields)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    logger.info(f"Analyzed {count} of {len(urls)} listings")
@@ -0,0 +1,116 @@
+import glob
+import gzip
+import heapq
+import json
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class HtmlArchive:
+    """
+    Append-only archive of fetched pages.
+
+    Pages are written to daily segment files (segment-YYYYMMDD-NN.warc.gz) as one gzip
+    member each, with a small WARC-style header. index.jsonl holds one line per record
+    with the segment, byte offset and length, so any page can be read back without
+    scanning the segments. Segments roll over at segment_max_bytes.
+
+    Only one process may append under the same writer name. Concurrent processes
+    each pass their own writer, which gets its own segments and index-<writer>.jsonl;
+    entries() reads all indexes of the directory.
+    """
+
+    def __init__(self, directory, segment_max_bytes=64 * 1024 * 1024, writer=None):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.writer = "".join(c if c.isalnum() or c in "-_." else "_" for c in writer) if writer else None
+        index_name = f"index-{self.writer}.jsonl" if self.writer else "index.jsonl"
+        self.index_path = os.path.join(directory, index_name)
+        os.makedirs(directory, exist_ok=True)
+
+    def _segment_for(self, day, size):
+        prefix = f"segment-{day}-{self.writer}" if self.writer else f"segment-{day}"
+        number = 0
+        while True:
+            name = f"{prefix}-{number:02d}.warc.gz"
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path) or os.path.getsize(path) + size <= self.segment_max_bytes:
+                return name, path
+            number += 1
+
+    def append(self, url, html, kind, **meta):
+        """Store one fetched page; meta (category, listing_id, card, ...) goes into the index."""
+        fetched_at = datetime.now()
+        body = html.encode("utf-8")
+        header = (
+            "WARC/1.0\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {fetched_at.strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            "Content-Type: text/html; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("utf-8")
+        record = gzip.compress(header + body)
+
+        segment, path = self._segment_for(fetched_at.strftime("%Y%m%d"), len(record))
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(record)
+
+        entry = {
+            "url": url,
+            "kind": kind,
+            "fetched_at": fetched_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "segment": segment,
+            "offset": offset,
+            "length": len(record),
+        }
+        entry.update(meta)
+
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        return entry
+
+    def _read_index(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash mid-write can leave a partial last line
+                    logger.warning(f"Skipping unreadable archive index line in {path}")
+
+    def entries(self, start_date=None, end_date=None, kind=None):
+        """
+        Index entries fetched between start_date and end_date (YYYY-MM-DD, inclusive),
+        from every writer's index, in fetch order.
+        """
+        paths = sorted(glob.glob(os.path.join(self.directory, "index*.jsonl")))
+        indexes = [self._read_index(path) for path in paths]
+
+        for entry in heapq.merge(*indexes, key=lambda entry: entry["fetched_at"]):
+            day = entry["fetched_at"][:10]
+            if start_date and day < start_date:
+                continue
+            if end_date and day > end_date:
+                continue
+            if kind and entry["kind"] != kind:
+                continue
+            yield entry
+
+    def read(self, entry):
+        """Return the HTML stored for an index entry."""
+        with open(os.path.join(self.directory, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            record = gzip.decompress(f.read(entry["length"]))
+
+        _, _, body = record.partition(b"\r\n\r\n")
+        return body.decode("utf-8")
@@ -0,0 +1,413 @@
+import re
+import glob
+import time
+import logging
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from funda_geocode import LOCATION_PATTERN, PostcodeIndex, geocode_dataframe, _detect_separator
+from funda_parsing import parse_area_m2, parse_build_period, parse_build_year, parse_price
+from funda_scraper import DEFAULT_OUTPUT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each distance component in the similarity score
+DEFAULT_WEIGHTS = {"plot_area": 1.0, "location": 1.0, "build_year": 0.5}
+
+# Distances are divided by these so one unit means roughly "as different again"
+AREA_SCALE = np.log(2)  # a factor 2 in plot size
+LOCATION_SCALE_KM = 25.0
+BUILD_YEAR_SCALE = 20.0
+
+# Postcode-only location distance: same PC4, same region (first two digits), elsewhere
+SAME_PC4, SAME_REGION, OTHER_REGION = 0.0, 0.5, 1.5
+
+# Distance component for a candidate that lacks the compared value
+MISSING_PENALTY = 1.0
+
+# Kenmerken columns of older exports ("<section>_<label>", spaces or underscores in the
+# label) that stand in for plot_area_m2 and build_year, in order of preference
+LEGACY_PLOT_AREA_COLUMNS = ["Oppervlakten_Perceel", "Oppervlakten_Totale oppervlakte", "Oppervlakten_Terrein oppervlak"]
+LEGACY_BUILD_YEAR_COLUMNS = ["Bouw_Bouwjaar", "Woonruimte_Bouwjaar"]
+LEGACY_BUILD_PERIOD_COLUMNS = ["Bouw_Bouwperiode", "Woonruimte_Bouwperiode"]
+
+# The category is the first path segment of a listing URL: fundainbusiness.nl/agrarische-grond/...
+URL_CATEGORY_PATTERN = r"^https?://[^/]+/([^/?#]+)/"
+
+# Columns carried from the listing CSVs into query results
+DISPLAY_COLUMNS = ["listing_id", "source_category", "title", "price", "location", "url", "scraped_at"]
+
+
+def _legacy_column(df, name):
+    """A kenmerken column of an older export, whether written with spaces or underscores."""
+    for candidate in (name, name.replace(" ", "_")):
+        if candidate in df.columns:
+            return df[candidate]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _fill_missing(df, name, values):
+    current = _column(df, name)
+    missing = current.isna() | (current.astype(str).str.strip() == "")
+    if missing.any():
+        df[name] = current.astype(object).where(~missing, values)
+
+
+def normalize_legacy_columns(df):
+    """
+    Fill scraped_at, source_category, plot_area_m2 and build_year for rows of older
+    exports, which only have scraped_date or initial_scraped_date, category (the card label, e.g. "Losse grond")
+    and the raw kenmerken columns. Values already present are kept.
+    """
+    df = df.copy()
+    _fill_missing(df, "scraped_at", _column(df, "scraped_date"))
+    _fill_missing(df, "scraped_at", _column(df, "initial_scraped_date"))
+    _fill_missing(df, "source_category", _column(df, "url").astype("string").str.extract(URL_CATEGORY_PATTERN)[0])
+
+    plot_area = pd.Series(np.nan, index=df.index)
+    for name in LEGACY_PLOT_AREA_COLUMNS:
+        plot_area = plot_area.fillna(pd.to_numeric(_legacy_column(df, name).map(parse_area_m2), errors="coerce"))
+    _fill_missing(df, "plot_area_m2", plot_area)
+
+    build_year = pd.Series(np.nan, index=df.index)
+    for name in LEGACY_BUILD_YEAR_COLUMNS:
+        build_year = build_year.fillna(pd.to_numeric(_legacy_column(df, name).map(parse_build_year), errors="coerce"))
+    for name in LEGACY_BUILD_PERIOD_COLUMNS:
+        build_year = build_year.fillna(pd.to_numeric(_legacy_column(df, name).map(parse_build_period), errors="coerce"))
+    _fill_missing(df, "build_year", build_year)
+
+    return df
+
+
+def load_listing_history(paths):
+    """
+    Read listing CSVs (scrapes, re-extractions, geocoded exports) into one DataFrame
+    with the most recently scraped row of every listing. Older exports' columns are
+    mapped first (see normalize_legacy_columns); undated rows count as the oldest.
+    """
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, sep=_detect_separator(path), encoding="utf-8-sig", dtype={"listing_id": "string"})
+        frames.append(normalize_legacy_columns(df))
+
+    if not frames:
+        return pd.DataFrame(columns=DISPLAY_COLUMNS)
+
+    df = pd.concat(frames, ignore_index=True)
+    if "scraped_at" in df.columns:
+        df = df.sort_values("scraped_at", kind="stable", na_position="first")
+    df = df.drop_duplicates("listing_id", keep="last").reset_index(drop=True)
+    logger.info(f"Listing history: {len(df)} listings from {len(frames)} files")
+    return df
+
+
+def _column(df, name):
+    return df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+
+def listing_features(df):
+    """
+    The numeric features of every listing: plot_area_m2 and build_year (from their
+    columns, falling back to the description and title for older exports), price_eur,
+    price_per_m2 and the postcode's 4 digits as pc4.
+    """
+    plot_area = pd.to_numeric(_column(df, "plot_area_m2"), errors="coerce")
+    missing = plot_area.isna()
+    if missing.any():
+        text = _column(df, "description").fillna("").astype(str) + " " + _column(df, "title").fillna("").astype(str)
+        plot_area[missing] = pd.to_numeric(text[missing].map(lambda t: parse_area_m2(t, free_text=True)), errors="coerce")
+
+    build_year = pd.to_numeric(_column(df, "build_year"), errors="coerce")
+    price = pd.to_numeric(_column(df, "price").map(parse_price), errors="coerce")
+    plot_area = plot_area.where(plot_area > 0)
+
+    locations = _column(df, "location").astype("string").str.extract(LOCATION_PATTERN)
+    pc4 = pd.to_numeric(locations["pc4"], errors="coerce")
+
+    return pd.DataFrame({
+        "plot_area_m2": plot_area,
+        "build_year": build_year,
+        "price_eur": price,
+        "price_per_m2": price / plot_area,
+        "pc4": pc4,
+    }, index=df.index)
+
+
+class ComparablesIndex:
+    """
+    k-nearest comparable listings over the listing history.
+
+    Listings with a known plot area are stored as parallel NumPy arrays sorted by
+    category and then log plot area, with the row range of every category kept in
+    a dict. A query takes its category's range, narrows it with np.searchsorted to
+    plot sizes within max_area_ratio of the wanted size, and scores that window in
+    one vectorized pass over plot size, location and build year.
+
+    Location distance is in km between coordinates where both sides are geocoded
+    (latitude/longitude columns, or a PostcodeIndex), otherwise by postcode area.
+    """
+
+    ARRAYS = ("log_area", "build_year", "pc4", "coords", "price_per_m2", "plot_area_m2", "price_eur")
+
+    def __init__(self, arrays, display, categories, postcode_index=None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.display = display
+        self.categories = categories
+        self.postcode_index = postcode_index
+        self.positions = {listing_id: pos for pos, listing_id in enumerate(display["listing_id"])}
+
+    @classmethod
+    def from_listings(cls, listings, postcode_index=None):
+        listings = normalize_legacy_columns(listings)
+        if postcode_index is not None:
+            listings = geocode_dataframe(listings, postcode_index)
+
+        features = listing_features(listings)
+        keep = features["plot_area_m2"].notna().to_numpy()
+        logger.info(f"Indexing {keep.sum()} of {len(listings)} listings with a known plot area")
+
+        listings = listings[keep].reset_index(drop=True)
+        features = features[keep].reset_index(drop=True)
+
+        category = _column(listings, "source_category").fillna("").astype(str).to_numpy()
+        log_area = np.log(features["plot_area_m2"].to_numpy(dtype=np.float64))
+        order = np.lexsort((log_area, category))
+
+        coords = np.column_stack([
+            pd.to_numeric(_column(listings, "latitude"), errors="coerce").to_numpy(dtype=np.float64),
+            pd.to_numeric(_column(listings, "longitude"), errors="coerce").to_numpy(dtype=np.float64),
+        ])
+        arrays = {
+            "log_area": log_area[order],
+            "build_year": features["build_year"].to_numpy(dtype=np.float64)[order],
+            "pc4": features["pc4"].fillna(-1).to_numpy(dtype=np.int32)[order],
+            "coords": coords[order].astype(np.float32),
+            "price_per_m2": features["price_per_m2"].to_numpy(dtype=np.float64)[order],
+            "plot_area_m2": features["plot_area_m2"].to_numpy(dtype=np.float64)[order],
+            "price_eur": features["price_eur"].to_numpy(dtype=np.float64)[order],
+        }
+        display = {
+            col: _column(listings, col).fillna("").astype(str).to_numpy()[order].astype(str)
+            for col in DISPLAY_COLUMNS
+        }
+
+        sorted_category = category[order]
+        categories = {}
+        for name in np.unique(sorted_category):
+            start = np.searchsorted(sorted_category, name, side="left")
+            stop = np.searchsorted(sorted_category, name, side="right")
+            categories[str(name)] = (int(start), int(stop))
+
+        return cls(arrays, display, categories, postcode_index)
+
+    @classmethod
+    def from_csv_files(cls, paths, postcode_index=None):
+        return cls.from_listings(load_listing_history(paths), postcode_index)
+
+    def save(self, path):
+        """Store the feature matrices as one .npz so queries can skip reading the CSVs."""
+        np.savez_compressed(
+            path,
+            category_names=np.array(list(self.categories), dtype=str),
+            category_ranges=np.array(list(self.categories.values()), dtype=np.int64).reshape(-1, 2),
+            **{name: getattr(self, name) for name in self.ARRAYS},
+            **{f"display_{col}": values for col, values in self.display.items()},
+        )
+        logger.info(f"Saved comparables index with {len(self)} listings to {path}")
+
+    @classmethod
+    def load(cls, path, postcode_index=None):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            display = {col: data[f"display_{col}"] for col in DISPLAY_COLUMNS}
+            categories = {
+                str(name): (int(start), int(stop))
+                for name, (start, stop) in zip(data["category_names"], data["category_ranges"])
+            }
+        return cls(arrays, display, categories, postcode_index)
+
+    def __len__(self):
+        return len(self.log_area)
+
+    def _query_coords(self, postcode):
+        if self.postcode_index is None or not postcode:
+            return None
+        geo = self.postcode_index.geocode(pd.Series([postcode]))
+        if geo["geocode_precision"].isna().iloc[0]:
+            return None
+        return np.array([geo["latitude"].iloc[0], geo["longitude"].iloc[0]], dtype=np.float64)
+
+    def _window(self, start, stop, log_area, max_area_ratio, k):
+        """Rows of [start, stop) whose plot size is within max_area_ratio, or the whole range if that has fewer than k."""
+        if log_area is None or not max_area_ratio:
+            return start, stop
+        block = self.log_area[start:stop]
+        spread = np.log(max_area_ratio)
+        low = start + np.searchsorted(block, log_area - spread, side="left")
+        high = start + np.searchsorted(block, log_area + spread, side="right")
+        return (low, high) if high - low >= k else (start, stop)
+
+    def query(
+        self,
+        listing_id=None,
+        plot_area_m2=None,
+        category=None,
+        postcode=None,
+        build_year=None,
+        k=10,
+        weights=None,
+        max_area_ratio=4.0,
+        require_price=True
+    ):
+        """
+        The k listings most similar to listing_id, or to the given attributes (any of
+        which override the listing's own), as a DataFrame ordered by distance.
+
+        category limits the search to that source category; postcode may be "5541",
+        "5541 SK" or a listing location. With require_price only listings with an
+        asking price, and so a price per m², are returned.
+        """
+        weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        query_coords = None
+        exclude = None
+
+        if listing_id is not None:
+            pos = self.positions.get(str(listing_id))
+            if pos is None:
+                raise KeyError(f"Listing {listing_id} is not in the comparables index (unknown, or no plot area)")
+            exclude = pos
+            plot_area_m2 = plot_area_m2 or self.plot_area_m2[pos]
+            category = category or self.display["source_category"][pos] or None
+            build_year = build_year or (None if np.isnan(self.build_year[pos]) else self.build_year[pos])
+            if postcode is None:
+                postcode = self.display["location"][pos]
+                if not np.isnan(self.coords[pos, 0]):
+                    query_coords = self.coords[pos].astype(np.float64)
+
+        if category is not None and category not in self.categories:
+            raise KeyError(f"No listings of category {category!r} in the comparables index")
+        start, stop = self.categories[category] if category is not None else (0, len(self))
+
+        pc4 = None
+        if postcode:
+            match = re.match(LOCATION_PATTERN, str(postcode))
+            pc4 = int(match.group("pc4")) if match and match.group("pc4") else None
+            if query_coords is None:
+                query_coords = self._query_coords(postcode)
+
+        log_area = np.log(plot_area_m2) if plot_area_m2 else None
+
+        if category is None:
+            # Categories are sorted separately, so log area is only ordered within one
+            window = (start, stop)
+        else:
+            window = self._window(start, stop, log_area, max_area_ratio, k)
+        rows = np.arange(*window)
+
+        score = np.zeros(len(rows))
+
+        if log_area is not None:
+            score += weights["plot_area"] * ((self.log_area[rows] - log_area) / AREA_SCALE) ** 2
+
+        if pc4 is not None or query_coords is not None:
+            score += weights["location"] * self._location_distance(rows, pc4, query_coords) ** 2
+
+        if build_year is not None:
+            years = self.build_year[rows]
+            year_distance = np.where(np.isnan(years), MISSING_PENALTY, np.abs(years - build_year) / BUILD_YEAR_SCALE)
+            score += weights["build_year"] * year_distance ** 2
+
+        if require_price:
+            score[np.isnan(self.price_per_m2[rows])] = np.inf
+        if exclude is not None:
+            score[rows == exclude] = np.inf
+
+        candidates = np.flatnonzero(np.isfinite(score))
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(score[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(score[candidates], kind="stable")]
+        best = rows[candidates]
+
+        result = pd.DataFrame({col: self.display[col][best] for col in DISPLAY_COLUMNS})
+        result["plot_area_m2"] = self.plot_area_m2[best]
+        result["build_year"] = pd.array(self.build_year[best], dtype="Float64").round().astype("Int64")
+        result["price_eur"] = self.price_eur[best]
+        result["price_per_m2"] = np.round(self.price_per_m2[best], 2)
+        result["distance"] = np.round(np.sqrt(score[candidates]), 3)
+        return result
+
+    def _location_distance(self, rows, pc4, query_coords):
+        """Scaled distance to every row: km where both sides have coordinates, postcode areas otherwise."""
+        row_pc4 = self.pc4[rows]
+        if pc4 is None:
+            distance = np.full(len(rows), MISSING_PENALTY)
+        else:
+            distance = np.where(
+                row_pc4 == pc4,
+                SAME_PC4,
+                np.where(row_pc4 // 100 == pc4 // 100, SAME_REGION, OTHER_REGION)
+            )
+            distance = np.where(row_pc4 < 0, MISSING_PENALTY, distance)
+
+        if query_coords is not None:
+            coords = self.coords[rows].astype(np.float64)
+            has_coords = ~np.isnan(coords[:, 0])
+            # Equirectangular approximation, accurate to well under 1% at these distances
+            lat = np.radians(coords[has_coords, 0])
+            dlat = lat - np.radians(query_coords[0])
+            dlon = (np.radians(coords[has_coords, 1]) - np.radians(query_coords[1])) * np.cos((lat + np.radians(query_coords[0])) / 2)
+            distance = distance.astype(np.float64)
+            distance[has_coords] = 6371.0 * np.hypot(dlat, dlon) / LOCATION_SCALE_KM
+
+        return distance
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Find comparable listings in the scraped listing history")
+    parser.add_argument("csv_files", nargs="*", help="listing CSVs; default: funda_agrarisch_*.csv in --output-dir")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="the scraper's output directory")
+    parser.add_argument("--index", default=None, help="load a saved .npz index instead of reading CSVs")
+    parser.add_argument("--save-index", default=None, help="write the index built from the CSVs to this .npz")
+    parser.add_argument("--postcodes", default=None, help="postcode table for km distances (see funda_geocode.py)")
+    parser.add_argument("--listing-id", default=None)
+    parser.add_argument("--plot-m2", type=float, default=None)
+    parser.add_argument("--category", default=None, help="source category, e.g. agrarische-grond")
+    parser.add_argument("--postcode", default=None)
+    parser.add_argument("--build-year", type=int, default=None)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    postcode_index = None
+    if args.postcodes:
+        postcode_index = PostcodeIndex.from_csv(args.postcodes)
+
+    if args.index:
+        comparables = ComparablesIndex.load(args.index, postcode_index)
+    else:
+        paths = args.csv_files or sorted(glob.glob(os.path.join(args.output_dir, "funda_agrarisch_*.csv")))
+        if not paths:
+            parser.error(f"no listing CSVs given and none found in {args.output_dir}")
+        comparables = ComparablesIndex.from_csv_files(paths, postcode_index)
+        if args.save_index:
+            comparables.save(args.save_index)
+
+    if args.listing_id or args.plot_m2 or args.postcode or args.build_year:
+        start = time.perf_counter()
+        result = comparables.query(
+            listing_id=args.listing_id,
+            plot_area_m2=args.plot_m2,
+            category=args.category,
+            postcode=args.postcode,
+            build_year=args.build_year,
+            k=args.k
+        )
+        logger.info(f"Query took {(time.perf_counter() - start) * 1000:.1f} ms over {len(comparables)} listings")
+
+        with pd.option_context("display.max_columns", None, "display.width", 200):
+            print(result.drop(columns=["url"]).to_string(index=False))
+        if len(result):
+            print(f"\nMedian price per m²: € {result['price_per_m2'].median():,.2f}")
@@ -0,0 +1,309 @@
+import json
+import logging
+import argparse
+import sqlite3
+import struct
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# "5541 SK Reusel", "5541SK Reusel", "5541 Reusel" or just "Reusel"
+LOCATION_PATTERN = r"^\s*(?:(?P<pc4>\d{4})\s*(?P<letters>[A-Za-z]{2})?\b)?\s*(?P<place>.*?)\s*$"
+
+GEO_COLUMNS = ["postcode", "latitude", "longitude", "geocode_precision"]
+
+
+def _pc6_keys(pc4, letters):
+    """Encode 4 digits + 2 letters as one integer: 5541 SK -> 5541 * 676 + 18 * 26 + 10."""
+    # View the fixed-width strings as their two code points per row
+    codes = np.char.upper(np.asarray(letters, dtype="U2")).view(np.uint32).reshape(-1, 2).astype(np.int64)
+    codes = np.where(codes > 0, codes - 65, 0)
+    return np.asarray(pc4, dtype=np.int64) * 676 + codes[:, 0] * 26 + codes[:, 1]
+
+
+class PostcodeIndex:
+    """
+    In-memory postcode -> coordinate lookup built from a local table, no network.
+
+    Full postcodes (PC6) and their 4-digit areas (PC4) are kept as sorted integer
+    key arrays with parallel float arrays of coordinates, so a whole column of
+    postcodes is resolved with one np.searchsorted call. A PC4 area's coordinates
+    come from the table's own PC4 row for it or, failing that, the mean of its PC6 rows.
+    """
+
+    def __init__(self, postcodes, latitudes, longitudes):
+        postcodes = pd.Series(postcodes, dtype="string").str.replace(" ", "", regex=False).str.upper()
+        table = pd.DataFrame({
+            "pc4": pd.to_numeric(postcodes.str[:4], errors="coerce"),
+            "letters": postcodes.str[4:6],
+            "lat": pd.to_numeric(pd.Series(latitudes), errors="coerce").to_numpy(),
+            "lon": pd.to_numeric(pd.Series(longitudes), errors="coerce").to_numpy(),
+        }).dropna(subset=["pc4", "lat", "lon"])
+
+        pc6 = table[table["letters"].str.len() == 2]
+        pc6_keys = _pc6_keys(pc6["pc4"].to_numpy(), pc6["letters"].to_numpy())
+        self.pc6_keys, self.pc6_coords = self._build(pc6_keys, pc6[["lat", "lon"]].to_numpy())
+
+        # Areas with their own PC4 row use it; the others get the mean of their PC6 rows
+        explicit_pc4 = table[table["letters"].fillna("").str.len() == 0].groupby("pc4")[["lat", "lon"]].mean()
+        pc4 = explicit_pc4.combine_first(pc6.groupby("pc4")[["lat", "lon"]].mean())
+        self.pc4_keys, self.pc4_coords = self._build(pc4.index.to_numpy(dtype=np.int64), pc4.to_numpy())
+
+        logger.info(f"Postcode index: {len(self.pc6_keys)} PC6 and {len(self.pc4_keys)} PC4 areas")
+
+    @staticmethod
+    def _build(keys, coords):
+        order = np.argsort(keys, kind="stable")
+        keys = np.asarray(keys, dtype=np.int64)[order]
+        coords = np.asarray(coords, dtype=np.float32)[order]
+        # Keep the first row of duplicate postcodes
+        unique = np.ones(len(keys), dtype=bool)
+        unique[1:] = keys[1:] != keys[:-1]
+        return keys[unique], coords[unique]
+
+    @classmethod
+    def from_csv(cls, path, postcode_column="postcode", lat_column="latitude", lon_column="longitude", sep=None):
+        table = pd.read_csv(
+            path,
+            sep=sep or _detect_separator(path),
+            usecols=[postcode_column, lat_column, lon_column],
+            dtype={postcode_column: "string"}
+        )
+        return cls(table[postcode_column], table[lat_column], table[lon_column])
+
+    @staticmethod
+    def _lookup(keys, coords, wanted):
+        result = np.full((len(wanted), 2), np.nan, dtype=np.float32)
+        if len(keys) == 0 or len(wanted) == 0:
+            return result, np.zeros(len(wanted), dtype=bool)
+
+        positions = np.clip(np.searchsorted(keys, wanted), 0, len(keys) - 1)
+        found = keys[positions] == wanted
+        result[found] = coords[positions[found]]
+        return result, found
+
+    def geocode(self, locations):
+        """
+        Resolve a sequence of location strings. Returns a DataFrame with postcode,
+        latitude, longitude and geocode_precision ("pc6", "pc4" or None).
+        """
+        parts = pd.Series(locations, dtype="string").str.extract(LOCATION_PATTERN)
+        pc4 = pd.to_numeric(parts["pc4"], errors="coerce")
+        letters = parts["letters"].fillna("").str.upper()
+        has_pc4 = pc4.notna().to_numpy()
+        has_pc6 = has_pc4 & (letters.str.len() == 2).to_numpy()
+
+        coords = np.full((len(parts), 2), np.nan, dtype=np.float32)
+        precision = np.full(len(parts), None, dtype=object)
+
+        pc6_keys = _pc6_keys(pc4[has_pc6].to_numpy(dtype=np.int64), letters[has_pc6].to_numpy())
+        pc6_coords, pc6_found = self._lookup(self.pc6_keys, self.pc6_coords, pc6_keys)
+        pc6_rows = np.flatnonzero(has_pc6)[pc6_found]
+        coords[pc6_rows] = pc6_coords[pc6_found]
+        precision[pc6_rows] = "pc6"
+
+        # Everything with a postcode that did not resolve as PC6 falls back to its PC4 area
+        fallback = has_pc4 & (precision == None)  # noqa: E711
+        pc4_coords, pc4_found = self._lookup(self.pc4_keys, self.pc4_coords, pc4[fallback].to_numpy(dtype=np.int64))
+        pc4_rows = np.flatnonzero(fallback)[pc4_found]
+        coords[pc4_rows] = pc4_coords[pc4_found]
+        precision[pc4_rows] = "pc4"
+
+        postcode = parts["pc4"].fillna("") + np.where(has_pc6, " " + letters, "")
+        return pd.DataFrame({
+            "postcode": postcode.mask(postcode == "").to_numpy(),
+            "latitude": coords[:, 0],
+            "longitude": coords[:, 1],
+            "geocode_precision": precision,
+        }, index=getattr(locations, "index", None))
+
+
+def _detect_separator(path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        header = f.readline()
+    return ";" if header.count(";") > header.count(",") else ","
+
+
+def geocode_dataframe(df, index, location_column="location"):
+    """Return df with the GEO_COLUMNS added (replacing earlier ones)."""
+    geo = index.geocode(df[location_column]) if location_column in df.columns else None
+    df = df.drop(columns=[col for col in GEO_COLUMNS if col in df.columns])
+    if geo is None:
+        logger.warning(f"No {location_column!r} column to geocode")
+        return df.assign(**{col: None for col in GEO_COLUMNS})
+
+    resolved = geo["geocode_precision"].notna().sum()
+    logger.info(f"Geocoded {resolved} of {len(df)} listings")
+    return pd.concat([df, geo.set_axis(df.index)], axis=1)
+
+
+def _properties(row, columns):
+    properties = {}
+    for col in columns:
+        value = row[col]
+        if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+            value = None
+        elif isinstance(value, np.generic):
+            value = value.item()
+        properties[col] = value
+    return properties
+
+
+def write_geojson(df, path):
+    """Stream the geocoded rows to a GeoJSON FeatureCollection, one feature at a time."""
+    columns = [col for col in df.columns if col not in ("latitude", "longitude")]
+    written = 0
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for row in df[df["latitude"].notna()].to_dict("records"):
+            feature = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [float(row["longitude"]), float(row["latitude"])]},
+                "properties": _properties(row, columns),
+            }
+            f.write((",\n" if written else "") + json.dumps(feature, ensure_ascii=False))
+            written += 1
+        f.write("\n]}\n")
+
+    logger.info(f"Wrote {written} features to {path}")
+    return written
+
+
+def _gpkg_point(lon, lat, srs_id=4326):
+    # GeoPackage binary header (magic, version 0, little-endian flag, no envelope) + WKB point
+    return b"GP" + struct.pack("<BBi", 0, 1, srs_id) + struct.pack("<BIdd", 1, 1, lon, lat)
+
+
+def write_geopackage(df, path, layer="listings"):
+    """
+    Write the geocoded rows as a point layer in a GeoPackage (WGS84), using only the
+    standard library's sqlite3. Attribute columns are stored as TEXT/REAL/INTEGER.
+    """
+    columns = [col for col in df.columns if col not in ("latitude", "longitude")]
+    points = df[df["latitude"].notna()]
+
+    def sql_type(col):
+        if pd.api.types.is_integer_dtype(df[col]):
+            return "INTEGER"
+        if pd.api.types.is_float_dtype(df[col]):
+            return "REAL"
+        return "TEXT"
+
+    db = sqlite3.connect(path)
+    try:
+        db.execute("PRAGMA application_id = 1196444487")  # 'GPKG'
+        db.execute("PRAGMA user_version = 10300")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT
+            )
+            """
+        )
+        db.executemany(
+            "INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+                ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None),
+                ("WGS 84", 4326, "EPSG", 4326,
+                 'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563]],'
+                 'PRIMEM["Greenwich",0],UNIT["degree",0.0174532925199433]]', None),
+            ]
+        )
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS gpkg_contents (
+                table_name TEXT PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT, description TEXT DEFAULT '',
+                last_change DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER
+            )
+            """
+        )
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+                PRIMARY KEY (table_name, column_name)
+            )
+            """
+        )
+
+        db.execute(f'DROP TABLE IF EXISTS "{layer}"')
+        db.execute("DELETE FROM gpkg_contents WHERE table_name = ?", (layer,))
+        db.execute("DELETE FROM gpkg_geometry_columns WHERE table_name = ?", (layer,))
+
+        column_defs = ", ".join(f'"{col}" {sql_type(col)}' for col in columns)
+        db.execute(f'CREATE TABLE "{layer}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POINT, {column_defs})')
+
+        bounds = (
+            (float(points["longitude"].min()), float(points["latitude"].min()),
+             float(points["longitude"].max()), float(points["latitude"].max()))
+            if len(points) else (None, None, None, None)
+        )
+        db.execute(
+            "INSERT INTO gpkg_contents (table_name, data_type, identifier, min_x, min_y, max_x, max_y, srs_id) "
+            "VALUES (?, 'features', ?, ?, ?, ?, ?, 4326)",
+            (layer, layer, *bounds)
+        )
+        db.execute(
+            "INSERT INTO gpkg_geometry_columns VALUES (?, 'geom', 'POINT', 4326, 0, 0)",
+            (layer,)
+        )
+
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        quoted = ", ".join(f'"{col}"' for col in columns)
+        rows = (
+            (_gpkg_point(float(row["longitude"]), float(row["latitude"])),
+             *_properties(row, columns).values())
+            for row in points.to_dict("records")
+        )
+        db.executemany(f'INSERT INTO "{layer}" (geom, {quoted}) VALUES ({placeholders})', rows)
+        db.commit()
+    finally:
+        db.close()
+
+    logger.info(f"Wrote {len(points)} features to {path} (layer {layer})")
+    return len(points)
+
+
+def geocode_csv_files(paths, index, location_column="location"):
+    """Read listing CSVs (scraper output or older exports) into one geocoded DataFrame."""
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, sep=_detect_separator(path), encoding="utf-8-sig", dtype={"listing_id": "string"})
+        df["source_file"] = str(path)
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame()
+    return geocode_dataframe(pd.concat(frames, ignore_index=True), index, location_column)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Geocode listing CSVs offline against a local postcode table")
+    parser.add_argument("csv_files", nargs="+")
+    parser.add_argument("--postcodes", required=True, help="CSV with postcode, latitude and longitude columns")
+    parser.add_argument("--postcode-column", default="postcode")
+    parser.add_argument("--lat-column", default="latitude")
+    parser.add_argument("--lon-column", default="longitude")
+    parser.add_argument("--location-column", default="location")
+    parser.add_argument("--geojson", default=None)
+    parser.add_argument("--gpkg", default=None)
+    parser.add_argument("--csv", default=None, help="also write the geocoded rows to this CSV")
+    args = parser.parse_args()
+
+    postcode_index = PostcodeIndex.from_csv(args.postcodes, args.postcode_column, args.lat_column, args.lon_column)
+    geocoded = geocode_csv_files(args.csv_files, postcode_index, args.location_column)
+
+    if args.geojson:
+        write_geojson(geocoded, args.geojson)
+    if args.gpkg:
+        write_geopackage(geocoded, args.gpkg)
+    if args.csv:
+        geocoded.to_csv(args.csv, index=False, encoding="utf-8-sig", sep=";")
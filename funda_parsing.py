@@ -0,0 +1,75 @@
+import re
+import pandas as pd
+
+AREA_UNITS = {"hectare": 10000, "ha": 10000, "are": 100, "a": 100, "ca": 1, "m²": 1, "m2": 1}
+AREA_PATTERN = re.compile(r"(\d+(?:[.,]\d+)*)\s*(hectare|ha|are|ca|a|m²|m2)(?!\w)", re.IGNORECASE)
+YEAR_PATTERN = re.compile(r"\b(1[5-9]\d\d|20\d\d)\b")
+
+# Rents as the site writes them: "/mnd", "/jr", "/m²/jaar", "per vierkante meter per jaar", ...
+RENT_PATTERN = re.compile(
+    r"/\s*(mnd|maand|jr|jaar|week|m²|m2)(?!\w)|\bper\s+(maand|jaar|week|vierkante|m²|m2)(?!\w)|\bhuur",
+    re.IGNORECASE
+)
+
+
+def _parse_number(text):
+    """Dutch notation: "12.345" -> 12345, "2,5" -> 2.5."""
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"\d{1,3}(\.\d{3})+", text):
+        text = text.replace(".", "")
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_area_m2(text, free_text=False):
+    """
+    Area in m² from a kenmerken value such as "12.345 m²", "2,5 ha" or the cadastral
+    "1 ha 23 a 45 ca" (parts are summed).
+
+    With free_text=True (descriptions, titles) only ha/hectare/m² mentions count and
+    the largest one is taken, as that is usually the whole plot.
+    """
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return None
+
+    areas = []
+    for number, unit in AREA_PATTERN.findall(str(text)):
+        unit = unit.lower()
+        if free_text and unit not in ("hectare", "ha", "m²", "m2"):
+            continue
+        value = _parse_number(number)
+        if value is not None:
+            areas.append(value * AREA_UNITS[unit])
+
+    if not areas:
+        return None
+    return max(areas) if free_text else sum(areas)
+
+
+def parse_build_year(text):
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return None
+    match = YEAR_PATTERN.search(str(text))
+    return int(match.group(1)) if match else None
+
+
+def parse_build_period(text):
+    """Middle year of a "Bouwperiode" such as "1971-1980"; a single year is taken as is."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return None
+    years = [int(year) for year in YEAR_PATTERN.findall(str(text))]
+    return sum(years[:2]) // len(years[:2]) if years else None
+
+def parse_price(text):
+    """Asking price in euros from "€ 250.000 k.k."; None for "Prijs op aanvraag" and rents."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return None
+    text = str(text)
+    if RENT_PATTERN.search(text):
+        return None
+    match = re.search(r"\d[\d.]*(?:,\d+)?", text)
+    return _parse_number(match.group(0)) if match else None
+
@@ -0,0 +1,104 @@
+import queue
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Stage:
+    """One pipeline step: `workers` threads applying func to items from a bounded inbox."""
+
+    def __init__(self, name, func, workers=1, maxsize=16):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.inbox = queue.Queue(maxsize=maxsize)
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self, outbox):
+        for idx in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                args=(outbox,),
+                name=f"pipeline-{self.name}-{idx}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self, outbox):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                return
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                logger.error(f"Error in pipeline stage {self.name}: {str(e)}")
+                result = None
+                with self._lock:
+                    self.errors += 1
+            else:
+                with self._lock:
+                    self.processed += 1
+            finally:
+                with self._lock:
+                    self.busy_seconds += time.perf_counter() - start
+
+            # put() blocks while the next stage is full, which is what pushes back
+            # on the stages before it
+            if result is not None and outbox is not None:
+                outbox.put(result)
+
+    def stop(self):
+        for _ in self._threads:
+            self.inbox.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+class Pipeline:
+    """
+    Stages connected by bounded queues, fed from the calling thread with put().
+
+    A stage function returns the item for the next stage, or None to drop it. When a
+    queue is full, put() in the stage before it blocks, so a slow stage slows the
+    producer down instead of letting work pile up in memory.
+    """
+
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:] + [None]):
+            stage.start(next_stage.inbox if next_stage else None)
+
+    def put(self, item):
+        self.stages[0].inbox.put(item)
+
+    def depths(self):
+        """Items waiting in front of each stage."""
+        return {stage.name: stage.inbox.qsize() for stage in self.stages}
+
+    def stats(self):
+        return {
+            stage.name: {
+                "processed": stage.processed,
+                "errors": stage.errors,
+                "busy_seconds": round(stage.busy_seconds, 1),
+            }
+            for stage in self.stages
+        }
+
+    def close(self):
+        """Let every stage finish its queued items, then stop the threads in order."""
+        for stage in self.stages:
+            stage.stop()
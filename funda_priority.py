@@ -0,0 +1,78 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATEGORY_WEIGHTS = {"agrarische-grond": 2, "agrarisch-bedrijf": 1}
+
+# Lower tier is fetched first
+PRIORITY_TIERS = {"new": 0, "price-changed": 1, "refresh": 2}
+
+
+class ListingState:
+    """
+    What earlier runs know about each listing, stored as JSON next to the CSVs.
+
+    For every listing whose detail page was fetched it keeps the search price at that
+    time and when it was refreshed. It also keeps the detail fetches a time-budgeted
+    run did not get to, so the next run can pick them up.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.listings = {}
+        self.pending = []
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read listing state {self.path}, starting empty: {e}")
+            return
+        self.listings = data.get("listings", {})
+        self.pending = data.get("pending", [])
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"listings": self.listings, "pending": self.pending}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def mark_refreshed(self, card):
+        self.listings[str(card["listing_id"])] = {
+            "price": card.get("price"),
+            "refreshed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+    def priority_reason(self, card):
+        known = self.listings.get(str(card["listing_id"]))
+        if known is None:
+            return "new"
+        if card.get("price") and card.get("price") != known.get("price"):
+            return "price-changed"
+        return "refresh"
+
+    def rank(self, cards, category_weights=None):
+        """
+        Order cards for detail fetching: new listings, then price changes, then the
+        longest-unrefreshed; within each tier heavier categories go first.
+        Returns (card, reason) pairs.
+        """
+        weights = DEFAULT_CATEGORY_WEIGHTS if category_weights is None else category_weights
+
+        def sort_key(item):
+            card, reason = item
+            known = self.listings.get(str(card["listing_id"]), {})
+            return (
+                PRIORITY_TIERS[reason],
+                -weights.get(card.get("source_category"), 0),
+                known.get("refreshed_at", ""),
+            )
+
+        return sorted(((card, self.priority_reason(card)) for card in cards), key=sort_key)
@@ -0,0 +1,138 @@
+import os
+import argparse
+import logging
+from multiprocessing import Pool
+from bs4 import BeautifulSoup
+from funda_archive import HtmlArchive
+from funda_scraper import FundaScraper, DEFAULT_OUTPUT_DIR
+
+logger = logging.getLogger(__name__)
+
+_worker_scraper = None
+
+
+def _offline_scraper(city, output_dir, image_categories=None, max_images_per_listing=8):
+    """A scraper used only for its parsers: no browser, no archiving, no downloads."""
+    return FundaScraper(
+        city=city,
+        output_dir=output_dir,
+        image_categories=image_categories,
+        max_images_per_listing=max_images_per_listing,
+        archive_html=False,
+        download_images=False,
+        start_driver=False
+    )
+
+
+def _init_worker(city, output_dir, image_categories, max_images_per_listing):
+    global _worker_scraper
+    _worker_scraper = _offline_scraper(city, output_dir, image_categories, max_images_per_listing)
+
+
+def _extract_entry(task):
+    """Run the current parsers over one archived page (in a worker process)."""
+    archive_dir, entry = task
+    html = HtmlArchive(archive_dir).read(entry)
+
+    if entry["kind"] == "search":
+        return entry, _worker_scraper._parse_search_cards(html, entry.get("category")) or [], None
+
+    soup = BeautifulSoup(html, "html.parser")
+    details = _worker_scraper._extract_detail_fields(soup, entry.get("source_category"), entry["listing_id"])
+    return entry, None, details
+
+
+def reextract(
+    archive_dir,
+    output_dir,
+    city="den-bosch",
+    start_date=None,
+    end_date=None,
+    processes=None,
+    image_categories=None,
+    max_images_per_listing=8
+):
+    """
+    Regenerate the listing CSVs from archived pages, without network access.
+
+    Every archived page fetched between start_date and end_date (YYYY-MM-DD, inclusive)
+    is parsed again with the current extractors in a process pool. One CSV is written
+    per scrape day; listings with only a search card get a row with empty details.
+    Returns a dict of day -> DataFrame.
+    """
+    archive = HtmlArchive(archive_dir)
+    scraper = _offline_scraper(city, output_dir, image_categories, max_images_per_listing)
+
+    entries = [
+        entry for entry in archive.entries(start_date, end_date)
+        if entry.get("city", scraper.city) == scraper.city
+    ]
+    logger.info(f"Re-extracting {len(entries)} archived pages from {archive_dir}")
+
+    days = {}
+
+    with Pool(
+        processes,
+        initializer=_init_worker,
+        initargs=(city, output_dir, image_categories, max_images_per_listing)
+    ) as pool:
+        tasks = [(archive_dir, entry) for entry in entries]
+        for entry, cards, details in pool.imap_unordered(_extract_entry, tasks, chunksize=8):
+            day = days.setdefault(entry["fetched_at"][:10], {"cards": {}, "details": {}})
+
+            if cards is not None:
+                for card in cards:
+                    day["cards"][card["listing_id"]] = (card, entry["fetched_at"])
+                continue
+
+            # Keep the latest fetch when a listing was visited more than once that day
+            previous = day["details"].get(entry["listing_id"])
+            if previous is None or previous[0]["fetched_at"] <= entry["fetched_at"]:
+                day["details"][entry["listing_id"]] = (entry, details)
+
+    results = {}
+    for day_key in sorted(days):
+        day = days[day_key]
+        rows = []
+
+        for listing_id, (entry, details) in day["details"].items():
+            # Prefer the re-extracted search card over the one stored at fetch time
+            if listing_id in day["cards"]:
+                card = day["cards"][listing_id][0]
+            else:
+                card = dict(entry.get("card") or {}, listing_id=listing_id)
+                card.setdefault("url", entry["url"])
+
+            row = scraper._build_listing_row(card, details)
+            row["scraped_at"] = entry["fetched_at"]
+            rows.append(row)
+
+        for listing_id, (card, fetched_at) in day["cards"].items():
+            if listing_id not in day["details"]:
+                row = scraper._build_listing_row(card, scraper._empty_details())
+                row["scraped_at"] = fetched_at
+                rows.append(row)
+
+        results[day_key] = scraper._save_listings(rows, f"reextracted_{day_key.replace('-', '')}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run the current extractors over archived Funda pages")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="directory for the regenerated CSVs")
+    parser.add_argument("--archive-dir", default=None, help="archive directory (default: <output-dir>/archive)")
+    parser.add_argument("--city", default="den-bosch")
+    parser.add_argument("--from", dest="start_date", default=None, help="first day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end_date", default=None, help="last day, YYYY-MM-DD")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    reextract(
+        archive_dir=args.archive_dir or os.path.join(args.output_dir, "archive"),
+        output_dir=args.output_dir,
+        city=args.city,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        processes=args.processes
+    )
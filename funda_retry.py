@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RetryQueue:
+    """
+    Persistent queue of URLs that failed to load, stored as JSON next to the CSVs.
+
+    Each entry keeps the job needed to redo the fetch (search page or listing detail),
+    the number of attempts so far and the earliest time it may be retried. The delay
+    doubles with every failed attempt, up to max_delay. With path=None the queue only
+    lives in memory. Safe to update from several threads of one process.
+    """
+
+    def __init__(self, path, base_delay=300, max_delay=6 * 3600, max_attempts=6):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.entries = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read retry queue {self.path}, starting empty: {e}")
+            return {}
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def record_failure(self, url, reason, job):
+        """Add or update a failed URL and schedule its next attempt."""
+        with self._lock:
+            entry = self.entries.get(url, {"url": url, "attempts": 0})
+            entry.update(job)
+            entry["attempts"] += 1
+            entry["last_error"] = reason
+            entry["last_failed_at"] = time.time()
+
+            delay = min(self.base_delay * 2 ** (entry["attempts"] - 1), self.max_delay)
+            entry["next_attempt_at"] = entry["last_failed_at"] + delay
+
+            self.entries[url] = entry
+            self.save()
+
+        if entry["attempts"] >= self.max_attempts:
+            logger.warning(f"Giving up on {url} after {entry['attempts']} attempts ({reason})")
+        else:
+            logger.info(f"Queued {url} for retry in {delay:.0f}s (attempt {entry['attempts']}, {reason})")
+
+    def record_success(self, url):
+        with self._lock:
+            if self.entries.pop(url, None) is not None:
+                self.save()
+
+    def due(self, now=None):
+        """Entries whose backoff has elapsed and that have attempts left, oldest first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = list(self.entries.values())
+        entries = [
+            entry for entry in entries
+            if entry["attempts"] < self.max_attempts and entry["next_attempt_at"] <= now
+        ]
+        return sorted(entries, key=lambda entry: entry["next_attempt_at"])
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CircuitBreaker:
+    """
+    Pause fetching when failures cluster.
+
+    After failure_threshold failures within window_seconds the breaker opens and the
+    next fetch waits for the cooldown. Each consecutive trip doubles the cooldown, up
+    to max_cooldown; a successful fetch resets it.
+    """
+
+    def __init__(self, failure_threshold=3, window_seconds=120, cooldown_seconds=120, max_cooldown=1800):
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown = max_cooldown
+        self.failure_times = []
+        self.consecutive_trips = 0
+        self.open_until = None
+
+    def before_request(self):
+        """Block until the breaker allows another fetch."""
+        if self.open_until is None:
+            return
+
+        remaining = self.open_until - time.time()
+        if remaining > 0:
+            logger.warning(f"Circuit breaker open, pausing fetches for {remaining:.0f}s")
+            time.sleep(remaining)
+
+        self.open_until = None
+
+    def record_success(self):
+        self.failure_times = []
+        self.consecutive_trips = 0
+
+    def record_failure(self):
+        now = time.time()
+        self.failure_times = [t for t in self.failure_times if now - t <= self.window_seconds]
+        self.failure_times.append(now)
+
+        if len(self.failure_times) >= self.failure_threshold:
+            cooldown = min(self.cooldown_seconds * 2 ** self.consecutive_trips, self.max_cooldown)
+            self.consecutive_trips += 1
+            self.open_until = now + cooldown
+            self.failure_times = []
+            logger.warning(
+                f"Circuit breaker tripped after {self.failure_threshold} failures "
+                f"within {self.window_seconds}s, cooling down {cooldown:.0f}s"
+            )
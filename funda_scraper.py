@@ -1,8 +1,10 @@
 import time
+import json
 import logging
 import random
 import re
 import os
+import threading
 import requests
 import pandas as pd
 from bs4 import BeautifulSoup
@@ -13,6 +15,16 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from datetime import datetime
+from funda_retry import RetryQueue, CircuitBreaker
+from funda_archive import HtmlArchive
+from funda_pipeline import Pipeline, Stage
+from funda_priority import ListingState
+from funda_geocode import PostcodeIndex, geocode_dataframe, write_geojson
+from funda_parsing import parse_area_m2, parse_build_year
+from funda_structured import (
+    extract_detail_fields as extract_structured_detail_fields,
+    extract_search_items as extract_structured_search_items,
+)
 
 # Set up logging
 logging.basicConfig(
@@ -21,6 +33,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_OUTPUT_DIR = r"C:\Users\AhmadrezaKarimHackRe\Hack Rentmeesters\GEOICT - Data\Funda-scraping-data"
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+]
+
+SEARCH_CARD_FIELDS = ("title", "category", "price", "url")
+
+# Card fields that must be known before a result page's cards can be skipped; category
+# is never in the ItemList and is then read from the cards' subtitles on their own
+SEARCH_CARD_REQUIRED_FIELDS = ("title", "price", "url")
+
+SCRAPE_MODES = ("full", "search-only")
+
+VERIFICATION_PAGE_MARKER = "Je bent bijna op de pagina die je zoekt"
+
+# What a search page without any listings still shows; anything else without
+# results (error pages, half-loaded pages) counts as a failed fetch
+EMPTY_SEARCH_PATTERN = re.compile(r"search-no-results|geen (zoek)?resultaten|\b0 resultaten\b", re.IGNORECASE)
+
+FIXED_COLUMNS = [
+    "listing_id",
+    "source_category",
+    "title",
+    "category",
+    "price",
+    "location",
+    "url",
+    "scraped_at",
+    "description",
+    "kadastrale_gegevens",
+    "plot_area_m2",
+    "build_year",
+    "image_count",
+    "image_folder",
+    "field_sources",
+]
+
 
 class FundaScraper:
     def __init__(
@@ -28,12 +80,43 @@ class FundaScraper:
         city="den-bosch",
         radius="50km",
         categories=None,
-        output_dir=r"C:\Users\AhmadrezaKarimHackRe\Hack Rentmeesters\GEOICT - Data\Funda-scraping-data",
+        output_dir=DEFAULT_OUTPUT_DIR,
         image_categories=None,
-        max_images_per_listing=8
+        max_images_per_listing=8,
+        archive_html=True,
+        download_images=True,
+        start_driver=True,
+        image_workers=4,
+        pipeline_queue_size=8,
+        thumbnail_widths=(360, 180),
+        highres_widths=(1440, 1080),
+        highres_listing_ids=None,
+        postcode_table=None,
+        base_url="https://www.fundainbusiness.nl",
+        request_delay=(2, 4),
+        page_delay=(3, 6)
     ):
-        """Initialize the Funda scraper for agrarian listings only."""
-        self.base_url = "https://www.fundainbusiness.nl"
+        """
+        Initialize the Funda scraper for agrarian listings only.
+
+        archive_html stores every fetched page in <output_dir>/archive for offline
+        re-extraction. download_images=False only counts images already on disk
+        and leaves the image folders and manifests untouched.
+        start_driver=False skips Chrome; scrape() and hydrate() start it when needed.
+        image_workers and pipeline_queue_size size the stages that parse pages and
+        download images behind the browser.
+        Images are fetched eagerly in the first available of thumbnail_widths; the
+        highres_widths tier only for highres_listing_ids or later via upgrade_images().
+        postcode_table (a CSV with postcode, latitude, longitude) turns on offline
+        geocoding of the location column, with a GeoJSON written next to each CSV.
+        base_url, request_delay and page_delay (seconds, min/max) exist mainly to run
+        against the local stand-in server in funda_standin.py.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.request_delay = request_delay
+        self.page_delay = page_delay
+        self.fetch_latencies = []
+        self._fetch_started = None
         self.city = city.lower().replace(" ", "-")
         self.radius = radius
         self.categories = categories or ["agrarisch-bedrijf", "agrarische-grond"]
@@ -41,11 +124,32 @@ class FundaScraper:
         self.images_dir = os.path.join(self.output_dir, "images")
         self.image_categories = image_categories or ["agrarische-grond"]
         self.max_images_per_listing = max_images_per_listing
+        self.thumbnail_widths = tuple(thumbnail_widths)
+        self.highres_widths = tuple(highres_widths)
+        self.highres_listing_ids = {str(listing_id) for listing_id in highres_listing_ids or []}
+        self.request_headers = {
+            "User-Agent": random.choice(USER_AGENTS),
+            "Referer": self.base_url
+        }
+        self.search_cards = {}
+        self.driver = None
+        self.retry_queue = RetryQueue(os.path.join(self.output_dir, "retry_queue.json"))
+        self.circuit_breaker = CircuitBreaker()
+        self.rate_limiter = None
+        self.image_workers = image_workers
+        self.pipeline_queue_size = pipeline_queue_size
+        self.images_skipped = []
+        self.listing_state = ListingState(os.path.join(self.output_dir, "listing_state.json"))
+        self.postcode_index = PostcodeIndex.from_csv(postcode_table) if postcode_table else None
 
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
 
-        self.setup_driver()
+        self.download_images = download_images
+        self.archive = HtmlArchive(os.path.join(self.output_dir, "archive")) if archive_html else None
+
+        if start_driver:
+            self.setup_driver()
 
     def setup_driver(self):
         """Setup Chrome driver with anti-detection measures."""
@@ -61,12 +165,7 @@ class FundaScraper:
             width, height = random.choice(window_sizes)
             options.add_argument(f"--window-size={width},{height}")
 
-            user_agents = [
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            ]
-            chosen_user_agent = random.choice(user_agents)
+            chosen_user_agent = random.choice(USER_AGENTS)
             options.add_argument(f"user-agent={chosen_user_agent}")
 
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
@@ -100,16 +199,67 @@ class FundaScraper:
         value = " ".join(value.split())
         return value if value else None
 
+    def _wait_before_fetch(self):
+        self.circuit_breaker.before_request()
+        time.sleep(random.uniform(*self.request_delay))
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait_for_slot()
+        self._fetch_started = time.monotonic()
+
+    def _record_fetch_latency(self):
+        if self._fetch_started is not None:
+            self.fetch_latencies.append(time.monotonic() - self._fetch_started)
+            self._fetch_started = None
+
+    def _with_search(self, entry):
+        """
+        A retry job or pending card tagged with this scraper's city and radius; the retry
+        queue and listing state live in output_dir, which all cities share by default.
+        """
+        return dict(entry, city=self.city, radius=self.radius)
+
+    def _is_own_search(self, entry):
+        """Whether a retry entry or pending card was stored by a scraper with this city and radius."""
+        # Entries from before city and radius were stored are taken as this search's
+        return (entry.get("city", self.city), entry.get("radius", self.radius)) == (self.city, self.radius)
+
+    def _record_fetch_failure(self, url, reason, job):
+        self._record_fetch_latency()
+        self.circuit_breaker.record_failure()
+        self.retry_queue.record_failure(url, reason, self._with_search(job))
+
+    def _record_fetch_success(self, url):
+        self._record_fetch_latency()
+        self.circuit_breaker.record_success()
+        self.retry_queue.record_success(url)
+
+    def _record_processing_failure(self, card, stage, error):
+        """A listing page that loaded but could not be parsed or enriched; queue it like a failed fetch."""
+        logger.error(f"Error in {stage} stage for listing {card['listing_id']}: {error}")
+        self.retry_queue.record_failure(
+            card["url"], f"{stage} failed: {error}", self._with_search({"kind": "detail", "card": card})
+        )
+
+    def _archive_page(self, url, html, kind, **meta):
+        if self.archive is None:
+            return
+        try:
+            self.archive.append(url, html, kind, city=self.city, **meta)
+        except Exception as e:
+            logger.warning(f"Could not archive page {url}: {e}")
+
     def get_page(self, category, page_num=1):
-        """Get HTML content of a search result page."""
+        """Get HTML content of a search result page, or None if it failed (the URL is queued for retry)."""
         url = f"{self.base_url}/{category}/{self.city}/+{self.radius}/"
         if page_num > 1:
             url += f"p{page_num}/"
 
+        job = {"kind": "search", "category": category, "page_num": page_num}
+
         logger.info(f"Searching category={category}, URL: {url}")
 
         try:
-            time.sleep(random.uniform(2, 4))
+            self._wait_before_fetch()
             self.driver.get(url)
 
             try:
@@ -120,25 +270,39 @@ class FundaScraper:
                 logger.info("Search results not immediately found, checking page content...")
                 page_source = self.driver.page_source
 
-                if "Je bent bijna op de pagina die je zoekt" in page_source:
+                if VERIFICATION_PAGE_MARKER in page_source:
                     logger.warning("Verification page detected.")
+                    self._record_fetch_failure(url, "verification page", job)
                     return None
 
+                if not EMPTY_SEARCH_PATTERN.search(page_source):
+                    logger.warning(f"No search results and no empty-result notice on {url}, treating as failed.")
+                    self._record_fetch_failure(url, "no search results rendered", job)
+                    return None
+
+                self._record_fetch_success(url)
+                self._archive_page(url, page_source, "search", category=category, page_num=page_num)
                 return page_source
 
             self._simulate_human_scrolling()
 
-            if "Je bent bijna op de pagina die je zoekt" in self.driver.page_source:
+            if VERIFICATION_PAGE_MARKER in self.driver.page_source:
                 logger.warning("Verification page detected.")
+                self._record_fetch_failure(url, "verification page", job)
                 return None
 
-            return self.driver.page_source
+            page_source = self.driver.page_source
+            self._record_fetch_success(url)
+            self._archive_page(url, page_source, "search", category=category, page_num=page_num)
+            return page_source
 
         except TimeoutException:
             logger.error("Timeout waiting for page to load")
+            self._record_fetch_failure(url, "timeout", job)
             return None
         except Exception as e:
             logger.error(f"Error fetching page {page_num} for category {category}: {str(e)}")
+            self._record_fetch_failure(url, str(e), job)
             return None
 
     def _simulate_human_scrolling(self):
@@ -217,45 +381,96 @@ class FundaScraper:
         unique_codes = list(dict.fromkeys(codes))
         return " | ".join(unique_codes) if unique_codes else None
 
-    def _parse_srcset_best_url(self, srcset):
+    def _extract_kenmerken(self, soup):
+        """All (section, label, value) entries of the kenmerken lists, nested lists included."""
+        kenmerken_body = soup.find("div", class_="object-kenmerken-body")
+        if not kenmerken_body:
+            return []
+
+        entries = []
+        current_section = None
+
+        for element in kenmerken_body.children:
+            if getattr(element, "name", None) == "h3":
+                current_section = self._normalize_text(element)
+
+            elif getattr(element, "name", None) == "dl":
+                for dt in element.find_all("dt"):
+                    if "object-kenmerken-group-header" in (dt.get("class") or []):
+                        continue
+                    dd = dt.find_next_sibling("dd")
+                    if dd:
+                        entries.append((current_section, self._normalize_text(dt), self._normalize_text(dd)))
+
+        return entries
+
+    def _extract_plot_and_build_year(self, soup):
         """
-        Prefer 1080w, then 720w, then 1440w, then 360w, then 180w.
-        Fallback to the largest available if no preferred width matches.
+        Plot area in m² and build year from the kenmerken. The plot area is the sum of the
+        parcels' "Oppervlakte" under Kadastrale gegevens, else the first "Perceel" entry.
         """
+        entries = self._extract_kenmerken(soup)
+
+        parcel_areas = [
+            parse_area_m2(value) for section, label, value in entries
+            if section == "Kadastrale gegevens" and label and label.lower() == "oppervlakte"
+        ]
+        parcel_areas = [area for area in parcel_areas if area]
+        plot_area = sum(parcel_areas) if parcel_areas else None
+
+        if plot_area is None:
+            for section, label, value in entries:
+                if label and label.lower().startswith("perceel"):
+                    plot_area = parse_area_m2(value)
+                    if plot_area:
+                        break
+
+        build_year = None
+        for section, label, value in entries:
+            if label and label.lower() == "bouwjaar":
+                build_year = parse_build_year(value)
+                if build_year:
+                    break
+
+        return {"plot_area_m2": plot_area or None, "build_year": build_year}
+
+    def _parse_srcset(self, srcset):
+        """Map every width in a srcset to its URL, e.g. {180: "...", 360: "...", 1080: "..."}."""
+        variants = {}
         if not srcset:
-            return None
+            return variants
 
-        candidates = []
         for item in srcset.split(","):
-            item = item.strip()
-            parts = item.split()
+            parts = item.strip().split()
             if len(parts) >= 2:
-                url = parts[0].strip()
-                width_text = parts[1].strip().lower()
-                match = re.match(r"(\d+)w", width_text)
+                match = re.match(r"(\d+)w", parts[1].strip().lower())
                 if match:
-                    width = int(match.group(1))
-                    candidates.append((width, url))
+                    variants[int(match.group(1))] = parts[0].strip()
 
-        if not candidates:
-            return None
+        return variants
 
-        preferred_order = [1080, 720, 1440, 360, 180]
-        candidate_dict = {width: url for width, url in candidates}
+    def _pick_variant(self, variants, preferred_widths):
+        """
+        First of preferred_widths that is available, else the width closest to the
+        first preference. Width 0 stands for an image without a srcset.
+        """
+        for width in preferred_widths:
+            if width in variants:
+                return width, variants[width]
 
-        for preferred_width in preferred_order:
-            if preferred_width in candidate_dict:
-                return candidate_dict[preferred_width]
+        known_widths = [width for width in variants if width > 0] or list(variants)
+        if not known_widths:
+            return None, None
 
-        # fallback: choose the largest available
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        return candidates[0][1]
+        width = min(known_widths, key=lambda w: abs(w - preferred_widths[0]))
+        return width, variants[width]
 
-    def _extract_image_urls(self, soup):
+    def _extract_images(self, soup):
         """
-        Extract unique gallery image URLs from the listing detail page.
+        Extract the unique gallery images from the listing detail page, each as a
+        dict of every available width to its URL.
         """
-        image_urls = []
+        images = {}
 
         for img in soup.find_all("img"):
             data_media_id = img.get("data-media-id")
@@ -266,103 +481,247 @@ class FundaScraper:
             if not data_media_id and not (src and "cloud.funda.nl/valentina_media/" in src):
                 continue
 
-            best_url = self._parse_srcset_best_url(srcset) if srcset else None
-            final_url = best_url or src
+            variants = {
+                width: url for width, url in self._parse_srcset(srcset).items()
+                if "cloud.funda.nl/valentina_media/" in url
+            }
+            if not variants and src and "cloud.funda.nl/valentina_media/" in src:
+                variants = {0: src}
+
+            if variants:
+                # The same photo appears in several galleries; key it by its largest variant
+                images.setdefault(variants[max(variants)], variants)
 
-            if final_url and "cloud.funda.nl/valentina_media/" in final_url:
-                image_urls.append(final_url)
+        return list(images.values())
 
-        unique_urls = list(dict.fromkeys(image_urls))
-        return unique_urls
+    def _image_manifest_path(self, listing_id):
+        return os.path.join(self.images_dir, str(listing_id), "manifest.json")
 
-    def _download_images_for_listing(self, listing_id, image_urls):
+    def _read_image_manifest(self, listing_id):
+        path = self._image_manifest_path(listing_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        # JSON turns the integer widths into strings
+        for entry in manifest["images"]:
+            entry["widths"] = {int(width): url for width, url in entry["widths"].items()}
+            entry["files"] = {int(width): name for width, name in entry["files"].items()}
+        return manifest
+
+    def _write_image_manifest(self, listing_id, manifest):
+        path = self._image_manifest_path(listing_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per writer, so concurrent writers never rename each other's file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _download_image(self, image_url, file_path):
+        response = requests.get(
+            image_url,
+            headers=self.request_headers,
+            timeout=30,
+            stream=True
+        )
+        response.raise_for_status()
+
+        with open(file_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+
+    def _download_images_for_listing(self, listing_id, images, highres=None):
         """
-        Download images into:
+        Download the thumbnail tier into:
         images/<listing_id>/<listing_id>_01.jpg
+        and, for flagged listings, the high-res tier into <listing_id>_01_1440w.jpg.
+
+        Every available width of every image is recorded in manifest.json next to
+        them, so upgrade_images() never needs the detail page again. With
+        download_images=False existing files are only counted; nothing is written.
         """
-        if not image_urls:
+        if not images:
             return 0, None
 
+        if highres is None:
+            highres = str(listing_id) in self.highres_listing_ids
+
         listing_folder = os.path.join(self.images_dir, str(listing_id))
-        os.makedirs(listing_folder, exist_ok=True)
+        if self.download_images:
+            os.makedirs(listing_folder, exist_ok=True)
+
+        previous = self._read_image_manifest(listing_id)
+        previous_files = {entry["index"]: entry["files"] for entry in previous["images"]} if previous else {}
 
+        manifest = {"listing_id": str(listing_id), "images": []}
         downloaded_count = 0
 
-        for idx, image_url in enumerate(image_urls[:self.max_images_per_listing], start=1):
-            try:
-                file_name = f"{listing_id}_{idx:02d}.jpg"
-                file_path = os.path.join(listing_folder, file_name)
+        for idx, variants in enumerate(images, start=1):
+            variants = {int(width): url for width, url in variants.items()}
+            entry = {"index": idx, "widths": variants, "files": dict(previous_files.get(idx, {}))}
+            manifest["images"].append(entry)
 
-                # Skip if already exists
-                if os.path.exists(file_path):
-                    downloaded_count += 1
+            if idx > self.max_images_per_listing:
+                continue
+
+            tiers = [(self.thumbnail_widths, f"{listing_id}_{idx:02d}.jpg", True)]
+            if highres:
+                tiers.append((self.highres_widths, None, False))
+
+            for preferred_widths, file_name, counted in tiers:
+                width, image_url = self._pick_variant(variants, preferred_widths)
+                if image_url is None or (not counted and (width == 0 or width in entry["files"])):
                     continue
 
-                response = requests.get(
-                    image_url,
-                    headers=self.request_headers,
-                    timeout=30,
-                    stream=True
-                )
-                response.raise_for_status()
+                file_name = file_name or f"{listing_id}_{idx:02d}_{width}w.jpg"
+                file_path = os.path.join(listing_folder, file_name)
 
-                with open(file_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
+                try:
+                    # Skip if already exists
+                    if not os.path.exists(file_path):
+                        if not self.download_images:
+                            continue
+                        self._download_image(image_url, file_path)
+                        entry["files"][width] = file_name
 
-                downloaded_count += 1
+                    if counted:
+                        downloaded_count += 1
 
-            except Exception as e:
-                logger.warning(f"Could not download image {image_url} for listing {listing_id}: {e}")
+                except Exception as e:
+                    logger.warning(f"Could not download image {image_url} for listing {listing_id}: {e}")
+
+        if self.download_images:
+            self._write_image_manifest(listing_id, manifest)
 
         relative_folder = os.path.join("images", str(listing_id))
         return downloaded_count, relative_folder if downloaded_count > 0 else None
 
-    def _extract_detail_fields(self, soup, source_category, listing_id):
-        """Extract clean fixed fields needed for CSV."""
-        details = {
+    def upgrade_images(self, listing_ids, widths=None):
+        """
+        Download the high-res tier for listings whose thumbnails were fetched earlier,
+        using only their image manifests. Returns the number of files downloaded.
+        """
+        widths = widths or self.highres_widths
+        downloaded = 0
+
+        for listing_id in listing_ids:
+            manifest = self._read_image_manifest(listing_id)
+            if manifest is None:
+                logger.warning(f"No image manifest for listing {listing_id}, skipping.")
+                continue
+
+            listing_folder = os.path.join(self.images_dir, str(listing_id))
+
+            for entry in manifest["images"][:self.max_images_per_listing]:
+                width, image_url = self._pick_variant(entry["widths"], widths)
+                # Nothing to upgrade when the only variant (or the chosen width) is already on disk
+                if image_url is None or width == 0 or width in entry["files"]:
+                    continue
+
+                file_name = f"{listing_id}_{entry['index']:02d}_{width}w.jpg"
+                file_path = os.path.join(listing_folder, file_name)
+                if os.path.exists(file_path):
+                    continue
+
+                try:
+                    self._download_image(image_url, file_path)
+                except Exception as e:
+                    logger.warning(f"Could not download image {image_url} for listing {listing_id}: {e}")
+                    continue
+
+                entry["files"][width] = file_name
+                downloaded += 1
+
+            self._write_image_manifest(listing_id, manifest)
+
+        logger.info(f"Downloaded {downloaded} high-res images for {len(listing_ids)} listings")
+        return downloaded
+
+    def _empty_details(self):
+        """Detail fields used when a listing page is not (or could not be) fetched."""
+        return {
             "price": None,
             "location": None,
             "description": None,
             "kadastrale_gegevens": None,
+            "plot_area_m2": None,
+            "build_year": None,
             "image_count": 0,
             "image_folder": None
         }
 
+    def _extract_detail_fields(self, soup, source_category, listing_id, with_images=True):
+        """
+        Extract clean fixed fields needed for CSV.
+
+        With with_images=False the images are returned under "images" instead
+        of being downloaded, so the download can run as a separate step.
+        """
+        details = self._empty_details()
+
+        # Embedded structured data first; the DOM is only walked for what it lacks
+        structured, sources = extract_structured_detail_fields(soup)
+        details.update(structured)
+
         header = soup.find("div", class_="object-header__content")
         if header:
             h1 = header.find("h1")
-            if h1:
+            if h1 and not details["location"]:
                 subtitle = h1.find("span", class_="object-header__subtitle")
                 details["location"] = self._normalize_text(subtitle)
 
+            # The header price keeps the qualifier (k.k., v.o.n., /mnd, /jr, /m²/jaar)
+            # that structured data usually leaves out, so it wins when present
             price_div = header.find("div", class_="object-header__pricing")
-            if price_div:
-                price = price_div.find("strong", class_="object-header__price")
-                details["price"] = self._normalize_text(price)
+            price = self._normalize_text(price_div.find("strong", class_="object-header__price")) if price_div else None
+            if price:
+                details["price"] = price
+                sources.pop("price", None)
 
-        description_section = soup.find("section", class_="object-description")
-        if description_section:
-            description_body = description_section.find("div", class_="object-description-body")
-            details["description"] = self._normalize_text(description_body)
+        if not details["description"]:
+            description_section = soup.find("section", class_="object-description")
+            if description_section:
+                description_body = description_section.find("div", class_="object-description-body")
+                details["description"] = self._normalize_text(description_body)
 
         details["kadastrale_gegevens"] = self._extract_kadastrale_gegevens(soup)
+        details.update(self._extract_plot_and_build_year(soup))
+
+        for field in ("price", "location", "description", "kadastrale_gegevens", "plot_area_m2", "build_year"):
+            if details[field] and field not in sources:
+                sources[field] = "dom"
+        details["field_sources"] = sources
 
         if source_category in self.image_categories:
-            image_urls = self._extract_image_urls(soup)
-            downloaded_count, image_folder = self._download_images_for_listing(listing_id, image_urls)
+            images = self._extract_images(soup)
+            if not with_images:
+                details["images"] = images
+                return details
+
+            downloaded_count, image_folder = self._download_images_for_listing(listing_id, images)
             details["image_count"] = downloaded_count
             details["image_folder"] = image_folder
 
         return details
 
-    def get_listing_details(self, url, source_category, listing_id):
-        """Get clean details from a listing page."""
+    def _fetch_listing_html(self, url, source_category, listing_id, card=None):
+        """
+        Load a listing page and return its HTML.
+
+        Returns None when the page could not be loaded; the URL is then queued for
+        retry together with its search card, so no half-empty row is written.
+        """
+        job = {
+            "kind": "detail",
+            "card": card or {"listing_id": listing_id, "source_category": source_category, "url": url}
+        }
+
         try:
             logger.info(f"Getting details for listing: {url}")
 
-            time.sleep(random.uniform(2, 4))
+            self._wait_before_fetch()
             self.driver.get(url)
 
             try:
@@ -371,40 +730,412 @@ class FundaScraper:
                 )
             except TimeoutException:
                 logger.warning(f"Timeout waiting for listing page to load: {url}")
-                return {
-                    "price": None,
-                    "location": None,
-                    "description": None,
-                    "kadastrale_gegevens": None,
-                    "image_count": 0,
-                    "image_folder": None
-                }
+                reason = "verification page" if VERIFICATION_PAGE_MARKER in self.driver.page_source else "timeout"
+                self._record_fetch_failure(url, reason, job)
+                return None
 
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            return self._extract_detail_fields(soup, source_category, listing_id)
+            page_source = self.driver.page_source
+            self._record_fetch_success(url)
+            self._archive_page(
+                url, page_source, "detail",
+                listing_id=listing_id, source_category=source_category, card=job["card"]
+            )
+            return page_source
 
         except Exception as e:
             logger.error(f"Error getting listing details: {str(e)}")
-            return {
-                "price": None,
-                "location": None,
-                "description": None,
-                "kadastrale_gegevens": None,
-                "image_count": 0,
-                "image_folder": None
-            }
+            self._record_fetch_failure(url, str(e), job)
+            return None
+
+    def get_listing_details(self, url, source_category, listing_id, card=None, with_images=True):
+        """Get clean details from a listing page, or None if it could not be loaded."""
+        page_source = self._fetch_listing_html(url, source_category, listing_id, card)
+        if page_source is None:
+            return None
+
+        try:
+            soup = BeautifulSoup(page_source, "html.parser")
+            return self._extract_detail_fields(soup, source_category, listing_id, with_images)
+        except Exception as e:
+            logger.error(f"Error parsing listing details for {url}: {str(e)}")
+            return None
+
+    def _listing_id_from_url(self, url):
+        match = re.search(r"object-(\d+)-", url) if url else None
+        return match.group(1) if match else None
+
+    def _parse_search_card(self, listing):
+        """Extract the card fields (id, title, category, price, url) from one search result."""
+        content = listing.find("div", class_="search-result-content")
+        if not content:
+            return None
+
+        content_inner = content.find("div", class_="search-result-content-inner")
+        if not content_inner:
+            return None
+
+        header_title_col = content_inner.find("div", class_="search-result__header-title-col")
+        title_link = header_title_col.find("a") if header_title_col else None
+        if not title_link:
+            return None
+
+        url = title_link.get("href")
+        if url and not url.startswith("http"):
+            url = f"{self.base_url}{url}"
+
+        listing_id = self._listing_id_from_url(url)
+        if not listing_id:
+            return None
+
+        category_text = None
+        category_h4 = content_inner.find("h4", class_="search-result__header-subtitle")
+        if category_h4:
+            category_text = self._normalize_text(category_h4)
+
+        price_from_search = None
+        price_div = content_inner.find("div", class_="search-result-info-price")
+        if price_div:
+            price_span = price_div.find("span")
+            if price_span:
+                price_from_search = self._normalize_text(price_span)
+
+        return {
+            "listing_id": listing_id,
+            "title": self._normalize_text(title_link),
+            "category": category_text,
+            "price": price_from_search,
+            "url": url
+        }
+
+    def _search_card_categories(self, soup):
+        """Category (card subtitle) of every result card on a search page, by listing_id."""
+        categories = {}
+        for listing in soup.find_all("div", class_="search-result-main"):
+            title_col = listing.find("div", class_="search-result__header-title-col")
+            title_link = title_col.find("a") if title_col else None
+            subtitle = listing.find("h4", class_="search-result__header-subtitle")
+            if not title_link or not subtitle:
+                continue
+            listing_id = self._listing_id_from_url(title_link.get("href"))
+            if listing_id:
+                categories[listing_id] = self._normalize_text(subtitle)
+        return categories
+
+    def _build_listing_row(self, card, details):
+        """Merge a search card with its detail fields into one CSV row."""
+        # Cards read back from a CSV carry field_sources as text; only dicts are merged
+        sources = {}
+        for part in (card, details):
+            if isinstance(part.get("field_sources"), dict):
+                sources.update(part["field_sources"])
+
+        row = {
+            "listing_id": card["listing_id"],
+            "source_category": card.get("source_category"),
+            "title": card.get("title"),
+            "category": card.get("category"),
+            "price": details.get("price") or card.get("price"),
+            "location": details.get("location") or card.get("location"),
+            "url": card.get("url"),
+            "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "description": details.get("description"),
+            "kadastrale_gegevens": details.get("kadastrale_gegevens"),
+            "plot_area_m2": details.get("plot_area_m2"),
+            "build_year": details.get("build_year"),
+            "image_count": details.get("image_count", 0),
+            "image_folder": details.get("image_folder")
+        }
+        row["field_sources"] = ", ".join(
+            f"{field}:{sources[field]}" for field in FIXED_COLUMNS if field in sources and row.get(field)
+        ) or None
+        return row
+
+    def _save_listings(self, all_listings, label=None):
+        """Write listing rows to a timestamped CSV and return them as a DataFrame."""
+        if not all_listings:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(all_listings)
+
+        for col in FIXED_COLUMNS:
+            if col not in df.columns:
+                df[col] = None
+
+        df = df[FIXED_COLUMNS]
 
-    def scrape(self, n_pages=None):
-        """Scrape agrarian listings and export them to a clean CSV only."""
+        logger.info(f"Total unique listings found: {len(df)}")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name_parts = ["funda_agrarisch", self.city]
+        if label:
+            name_parts.append(label)
+        name_parts.append(timestamp)
+        filename = os.path.join(self.output_dir, "_".join(name_parts) + ".csv")
+
+        if self.postcode_index is not None:
+            df = geocode_dataframe(df, self.postcode_index)
+            write_geojson(df, filename[:-len(".csv")] + ".geojson")
+
+        df.to_csv(filename, index=False, encoding="utf-8-sig", sep=";")
+
+        logger.info(f"Saved {len(df)} listings to {filename}")
+        return df
+
+    def _close_driver(self):
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.error(f"Error while closing the driver: {e}")
+        finally:
+            self.driver = None
+
+    def _parse_search_cards(self, html_content, category):
+        """
+        All search cards on a result page, or None when the page has no listings at all.
+
+        Cards come from the page's structured data (ItemList) where possible; the
+        result divs are only fully parsed when some card lacks its title, url or a
+        price with a known unit. Category is not in the ItemList, so otherwise only the
+        cards' subtitles are read for it.
+        """
+        soup = BeautifulSoup(html_content, "html.parser")
+
+        cards = {}
+        for url, item in extract_structured_search_items(soup, self.base_url).items():
+            listing_id = self._listing_id_from_url(url)
+            if listing_id:
+                cards[listing_id] = {
+                    "listing_id": listing_id,
+                    "title": item.get("title"),
+                    "category": None,
+                    "price": item.get("price"),
+                    "url": url,
+                    "field_sources": item["sources"]
+                }
+
+        complete = cards and all(
+            all(card[field] for field in SEARCH_CARD_REQUIRED_FIELDS) for card in cards.values()
+        )
+        if complete:
+            for listing_id, category_text in self._search_card_categories(soup).items():
+                if listing_id in cards and category_text:
+                    cards[listing_id]["category"] = category_text
+                    cards[listing_id]["field_sources"]["category"] = "dom"
+        else:
+            listings = soup.find_all("div", class_="search-result-main")
+            if not listings and not cards:
+                return None
+
+            for listing in listings:
+                try:
+                    dom_card = self._parse_search_card(listing)
+                except Exception as e:
+                    logger.error(f"Error parsing one listing: {str(e)}")
+                    continue
+
+                if not dom_card:
+                    continue
+
+                card = cards.setdefault(dom_card["listing_id"], dict(dom_card, field_sources={}))
+                for field in SEARCH_CARD_FIELDS:
+                    if not card.get(field) and dom_card.get(field):
+                        card[field] = dom_card[field]
+                    if card.get(field) and field not in card["field_sources"]:
+                        card["field_sources"][field] = "dom"
+
+        for card in cards.values():
+            card["source_category"] = category
+
+        return list(cards.values())
+
+    def _start_pipeline(self, all_listings, deadline=None):
+        """
+        Start the parse -> enrich -> persist stages that run behind the browser.
+
+        Items are (card, page_source) pairs; page_source is None for search-only rows.
+        Parsing (including kadaster) and image downloads happen in their own threads,
+        so the browser can load the next page meanwhile; rows end up in all_listings.
+        A listing whose parse or enrich step fails is left out and queued for retry.
+
+        After the deadline (time.monotonic()) enrich no longer downloads images, so a
+        budgeted run is not held up by its image backlog; those cards are collected in
+        self.images_skipped.
+        """
+        self.images_skipped = []
+
+        def parse(item):
+            card, page_source = item
+            if page_source is None:
+                return card, self._empty_details()
+
+            try:
+                soup = BeautifulSoup(page_source, "html.parser")
+                details = self._extract_detail_fields(
+                    soup, card.get("source_category"), card["listing_id"], with_images=False
+                )
+            except Exception as e:
+                self._record_processing_failure(card, "parse", e)
+                return None
+            return card, details
+
+        def enrich(item):
+            card, details = item
+            images = details.pop("images", None)
+            if images and deadline is not None and time.monotonic() >= deadline:
+                self.images_skipped.append(card)
+            elif images:
+                try:
+                    downloaded_count, image_folder = self._download_images_for_listing(card["listing_id"], images)
+                except Exception as e:
+                    self._record_processing_failure(card, "enrich", e)
+                    return None
+                details["image_count"] = downloaded_count
+                details["image_folder"] = image_folder
+            return card, details
+
+        def persist(item):
+            card, details = item
+            listing_data = self._build_listing_row(card, details)
+            all_listings.append(listing_data)
+            logger.info(f"Successfully scraped listing: {listing_data['title']}")
+
+        return Pipeline([
+            Stage("parse", parse, workers=1, maxsize=self.pipeline_queue_size),
+            Stage("enrich", enrich, workers=self.image_workers, maxsize=self.pipeline_queue_size),
+            Stage("persist", persist, workers=1, maxsize=self.pipeline_queue_size),
+        ])
+
+    def _close_pipeline(self, pipeline):
+        pipeline.close()
+        logger.info(f"Pipeline stages: {pipeline.stats()}")
+
+    def _fetch_into_pipeline(self, card, pipeline):
+        """Load a card's listing page and hand it to the pipeline; failed pages are left out."""
+        page_source = self._fetch_listing_html(
+            url=card["url"],
+            source_category=card.get("source_category"),
+            listing_id=card["listing_id"],
+            card=card
+        )
+        if page_source is not None:
+            self.listing_state.mark_refreshed(card)
+            pipeline.put((card, page_source))
+
+    def _fetch_by_priority(self, cards, seen_listing_ids, pipeline, deadline, category_weights=None):
+        """
+        Fetch detail pages in priority order until the deadline (time.monotonic()).
+
+        Listings left over from the previous budgeted run of the same city, radius and
+        categories are ranked along with this run's cards; other searches' leftovers are
+        kept for them. A fetch is not started when the remaining time is less than the
+        average fetch so far; whatever is left is stored as pending for the next run,
+        and this run's unreached cards are written as search-only rows.
+        """
+        carried_over, other_searches = [], []
+        for card in self.listing_state.pending:
+            if self._is_own_search(card) and card.get("source_category") in self.categories:
+                if card["listing_id"] not in seen_listing_ids:
+                    carried_over.append(card)
+            else:
+                other_searches.append(card)
+        ranked = self.listing_state.rank(cards + carried_over, category_weights)
+
+        reasons = {}
+        for _, reason in ranked:
+            reasons[reason] = reasons.get(reason, 0) + 1
+        logger.info(f"Detail fetches by priority: {reasons} ({len(carried_over)} carried over)")
+
+        average_fetch = None
+        pending = []
+
+        for idx, (card, reason) in enumerate(ranked):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (average_fetch is not None and remaining < average_fetch):
+                pending = [self._with_search(pending_card) for pending_card, _ in ranked[idx:]]
+                logger.info(f"Time budget used up, {len(pending)} detail fetches left for the next run")
+                # Carried-over cards not seen on this run's search pages may be gone
+                for pending_card in pending:
+                    if pending_card["listing_id"] in seen_listing_ids:
+                        pipeline.put((pending_card, None))
+                break
+
+            start = time.monotonic()
+            self._fetch_into_pipeline(card, pipeline)
+            elapsed = time.monotonic() - start
+            average_fetch = elapsed if average_fetch is None else 0.8 * average_fetch + 0.2 * elapsed
+
+        self.listing_state.pending = other_searches + pending
+
+    def _scrape_search_page(self, html_content, category, mode, seen_listing_ids, pipeline, deferred_cards=None):
+        """
+        Parse one search result page and feed every new listing into the pipeline.
+
+        When deferred_cards is a list, full-mode cards are collected there instead of
+        fetched right away. Returns False when the page has no listings at all.
+        Listings whose detail page fails are left out; they are in the retry queue.
+        """
+        cards = self._parse_search_cards(html_content, category)
+        if cards is None:
+            return False
+
+        for card in cards:
+            try:
+                listing_id = card["listing_id"]
+                if listing_id in seen_listing_ids:
+                    continue
+
+                seen_listing_ids.add(listing_id)
+                self.search_cards[listing_id] = card
+
+                if mode == "search-only":
+                    pipeline.put((card, None))
+                elif deferred_cards is not None:
+                    deferred_cards.append(card)
+                else:
+                    self._fetch_into_pipeline(card, pipeline)
+
+            except Exception as e:
+                logger.error(f"Error parsing one listing: {str(e)}")
+                continue
+
+        return True
+
+    def scrape(self, n_pages=None, mode="full", time_budget=None, category_weights=None):
+        """
+        Scrape agrarian listings and export them to a clean CSV only.
+
+        mode="full" visits every listing page for details, kadaster and images.
+        mode="search-only" keeps just the search card fields; use hydrate() later
+        for the listings that need details.
+
+        With time_budget (seconds) all search pages are read first, then detail pages
+        are fetched by priority (see ListingState.rank, category_weights) until the
+        budget runs out. Listings not reached are saved for the next run.
+        """
         all_listings = []
         seen_listing_ids = set()
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        deferred_cards = [] if deadline is not None and mode == "full" else None
 
         logger.info("Starting scraper for Funda Business agrarian listings only")
         logger.info(f"Search criteria: City={self.city}, Radius={self.radius}")
         logger.info(f"Categories: {self.categories}")
         logger.info(f"Output directory: {self.output_dir}")
+        logger.info(f"Mode: {mode}")
+        if time_budget is not None:
+            logger.info(f"Time budget: {time_budget}s")
+
+        if mode not in SCRAPE_MODES:
+            raise ValueError(f"Unknown scrape mode {mode!r}, expected one of {SCRAPE_MODES}")
+
+        pipeline = self._start_pipeline(all_listings, deadline)
 
         try:
+            if self.driver is None:
+                self.setup_driver()
+
             for category in self.categories:
                 logger.info(f"--- Processing category: {category} ---")
 
@@ -430,142 +1161,256 @@ class FundaScraper:
                     if not html_content:
                         continue
 
-                    soup = BeautifulSoup(html_content, "html.parser")
-                    listings = soup.find_all("div", class_="search-result-main")
-
-                    if not listings:
+                    if not self._scrape_search_page(
+                        html_content, category, mode, seen_listing_ids, pipeline, deferred_cards
+                    ):
                         logger.info(f"No listings found on page {page} for category {category}")
                         break
 
-                    for listing in listings:
-                        try:
-                            content = listing.find("div", class_="search-result-content")
-                            if not content:
-                                continue
-
-                            content_inner = content.find("div", class_="search-result-content-inner")
-                            if not content_inner:
-                                continue
-
-                            header_title_col = content_inner.find("div", class_="search-result__header-title-col")
-                            title_link = header_title_col.find("a") if header_title_col else None
-                            if not title_link:
-                                continue
-
-                            url = title_link.get("href")
-                            if url and not url.startswith("http"):
-                                url = f"{self.base_url}{url}"
-
-                            listing_id = None
-                            if url:
-                                match = re.search(r"object-(\d+)-", url)
-                                if match:
-                                    listing_id = match.group(1)
-
-                            if not listing_id:
-                                continue
-
-                            if listing_id in seen_listing_ids:
-                                continue
-
-                            seen_listing_ids.add(listing_id)
-
-                            title_text = self._normalize_text(title_link)
-
-                            category_text = None
-                            category_h4 = content_inner.find("h4", class_="search-result__header-subtitle")
-                            if category_h4:
-                                category_text = self._normalize_text(category_h4)
-
-                            price_from_search = None
-                            price_div = content_inner.find("div", class_="search-result-info-price")
-                            if price_div:
-                                price_span = price_div.find("span")
-                                if price_span:
-                                    price_from_search = self._normalize_text(price_span)
-
-                            details = self.get_listing_details(
-                                url=url,
-                                source_category=category,
-                                listing_id=listing_id
-                            ) if url else {
-                                "price": None,
-                                "location": None,
-                                "description": None,
-                                "kadastrale_gegevens": None,
-                                "image_count": 0,
-                                "image_folder": None
-                            }
-
-                            listing_data = {
-                                "listing_id": listing_id,
-                                "source_category": category,
-                                "title": title_text,
-                                "category": category_text,
-                                "price": details.get("price") or price_from_search,
-                                "location": details.get("location"),
-                                "url": url,
-                                "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "description": details.get("description"),
-                                "kadastrale_gegevens": details.get("kadastrale_gegevens"),
-                                "image_count": details.get("image_count", 0),
-                                "image_folder": details.get("image_folder")
-                            }
-
-                            all_listings.append(listing_data)
-                            logger.info(f"Successfully scraped listing: {listing_data['title']}")
-
-                        except Exception as e:
-                            logger.error(f"Error parsing one listing: {str(e)}")
-                            continue
+                    logger.info(f"Pipeline queue depths: {pipeline.depths()}")
 
                     if page < total_pages:
-                        time.sleep(random.uniform(3, 6))
-
-            if all_listings:
-                df = pd.DataFrame(all_listings)
-
-                fixed_columns = [
-                    "listing_id",
-                    "source_category",
-                    "title",
-                    "category",
-                    "price",
-                    "location",
-                    "url",
-                    "scraped_at",
-                    "description",
-                    "kadastrale_gegevens",
-                    "image_count",
-                    "image_folder",
-                ]
-
-                for col in fixed_columns:
-                    if col not in df.columns:
-                        df[col] = None
-
-                df = df[fixed_columns]
-
-                logger.info(f"Total unique listings found: {len(df)}")
-
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = os.path.join(
-                    self.output_dir,
-                    f"funda_agrarisch_{self.city}_{timestamp}.csv"
+                        time.sleep(random.uniform(*self.page_delay))
+
+            if deferred_cards is not None:
+                self._fetch_by_priority(deferred_cards, seen_listing_ids, pipeline, deadline, category_weights)
+
+            self._close_pipeline(pipeline)
+
+            if self.images_skipped:
+                logger.info(f"Time budget used up, images of {len(self.images_skipped)} listings left for the next run")
+                for card in self.images_skipped:
+                    # Not fully refreshed: rank it ahead of ordinary refreshes next time
+                    self.listing_state.listings.pop(str(card["listing_id"]), None)
+                self.listing_state.pending.extend(self._with_search(card) for card in self.images_skipped)
+            return self._save_listings(all_listings, "search" if mode == "search-only" else None)
+
+        finally:
+            self._close_driver()
+            pipeline.close()
+            self.listing_state.save()
+
+    def hydrate(self, listing_ids, listings=None):
+        """
+        Fetch details, kadaster and images for search cards collected earlier.
+
+        Cards are looked up in the cards from this scraper's previous scrape() calls,
+        or in `listings` (a DataFrame or list of dicts, e.g. a search-only CSV).
+        """
+        cards = dict(self.search_cards)
+        if listings is not None:
+            records = listings.to_dict("records") if hasattr(listings, "to_dict") else listings
+            for record in records:
+                cards[str(record["listing_id"])] = record
+
+        all_listings = []
+        pipeline = self._start_pipeline(all_listings)
+
+        try:
+            if self.driver is None:
+                self.setup_driver()
+
+            for listing_id in listing_ids:
+                listing_id = str(listing_id)
+                card = cards.get(listing_id)
+                if not card or not card.get("url"):
+                    logger.warning(f"No search card with a URL for listing {listing_id}, skipping.")
+                    continue
+
+                self._fetch_into_pipeline(dict(card, listing_id=listing_id), pipeline)
+
+            self._close_pipeline(pipeline)
+            return self._save_listings(all_listings, "hydrated")
+
+        finally:
+            self._close_driver()
+            pipeline.close()
+            self.listing_state.save()
+
+    def process_retry_queue(self, mode="full"):
+        """
+        Retry the queued URLs whose backoff has elapsed and save the recovered listings.
+
+        Only entries queued by a scraper with the same city and radius are retried;
+        the others stay queued for that scraper. Search pages are parsed like in
+        scrape(); detail pages are re-fetched for the search card stored with them.
+        """
+        all_listings = []
+        seen_listing_ids = set()
+
+        if mode not in SCRAPE_MODES:
+            raise ValueError(f"Unknown scrape mode {mode!r}, expected one of {SCRAPE_MODES}")
+
+        pipeline = self._start_pipeline(all_listings)
+
+        try:
+            due_entries = [entry for entry in self.retry_queue.due() if self._is_own_search(entry)]
+            logger.info(
+                f"{len(due_entries)} of {len(self.retry_queue)} queued URLs are due for retry "
+                f"for {self.city} +{self.radius}"
+            )
+
+            if due_entries and self.driver is None:
+                self.setup_driver()
+
+            for entry in due_entries:
+                if entry["kind"] == "search":
+                    html_content = self.get_page(entry["category"], entry["page_num"])
+                    if html_content:
+                        self._scrape_search_page(
+                            html_content, entry["category"], mode, seen_listing_ids, pipeline
+                        )
+                    continue
+
+                card = entry["card"]
+                if card["listing_id"] in seen_listing_ids:
+                    continue
+
+                seen_listing_ids.add(card["listing_id"])
+                self._fetch_into_pipeline(card, pipeline)
+
+            self._close_pipeline(pipeline)
+            logger.info(f"{len(self.retry_queue)} URLs remain in the retry queue")
+            return self._save_listings(all_listings, "retry")
+
+        finally:
+            self._close_driver()
+            pipeline.close()
+            self.listing_state.save()
+
+    def enqueue_search_jobs(self, work_queue, n_pages=None):
+        """Seed a shared work queue with the first search page of every category."""
+        for category in self.categories:
+            work_queue.put(
+                "search",
+                f"{self.city}/{self.radius}/{category}/1",
+                {"category": category, "page_num": 1, "n_pages": n_pages}
+            )
+        logger.info(f"Queued search jobs for categories {self.categories}")
+
+    def _run_job(self, work_queue, job, mode):
+        """Process one leased job; returns False when the page could not be fetched."""
+        payload = job["payload"]
+
+        if job["kind"] == "search":
+            category, page_num = payload["category"], payload["page_num"]
+            html_content = self.get_page(category, page_num)
+            if not html_content:
+                return False
+
+            if page_num == 1:
+                total_pages = self.get_total_pages()
+                if payload.get("n_pages") is not None:
+                    total_pages = min(total_pages, payload["n_pages"])
+
+                for page in range(2, total_pages + 1):
+                    work_queue.put(
+                        "search",
+                        f"{self.city}/{self.radius}/{category}/{page}",
+                        {"category": category, "page_num": page}
+                    )
+
+            for card in self._parse_search_cards(html_content, category) or []:
+                if mode == "search-only":
+                    work_queue.merge_result(card["listing_id"], self._build_listing_row(card, self._empty_details()))
+                else:
+                    work_queue.put("detail", card["listing_id"], {"card": card})
+            return True
+
+        if job["kind"] == "detail":
+            card = payload["card"]
+            details = self.get_listing_details(
+                url=card["url"],
+                source_category=card.get("source_category"),
+                listing_id=card["listing_id"],
+                card=card,
+                with_images=False
+            )
+            if details is None:
+                return False
+
+            work_queue.merge_result(card["listing_id"], self._build_listing_row(card, details))
+            if details.get("images"):
+                work_queue.put(
+                    "images",
+                    card["listing_id"],
+                    {"listing_id": card["listing_id"], "images": details["images"]}
                 )
+            return True
+
+        downloaded_count, image_folder = self._download_images_for_listing(
+            payload["listing_id"], payload["images"]
+        )
+        # Single image errors are only logged; when none of them worked, let the queue retry
+        if downloaded_count == 0 and self.download_images and self.max_images_per_listing > 0:
+            return False
+
+        work_queue.merge_result(
+            payload["listing_id"],
+            {"image_count": downloaded_count, "image_folder": image_folder}
+        )
+        return True
+
+    def run_worker(self, work_queue, mode="full", worker_id="worker", lease_seconds=600, poll_seconds=10):
+        """
+        Drain a shared work queue together with other workers.
+
+        Search jobs queue the remaining pages and a detail job per card, detail jobs
+        queue an images job. Fetches wait for the queue's global rate limit. Returns
+        when no job is pending or leased by another worker.
 
-                df.to_csv(filename, index=False, encoding="utf-8-sig", sep=";")
+        Failed jobs are retried by the work queue, so the JSON retry queue is not used
+        while working, and pages are archived under this worker's own segments and
+        index; other workers share the output directory.
+        """
+        if mode not in SCRAPE_MODES:
+            raise ValueError(f"Unknown scrape mode {mode!r}, expected one of {SCRAPE_MODES}")
 
-                logger.info(f"Saved {len(df)} listings to {filename}")
-                return df
+        retry_queue, archive = self.retry_queue, self.archive
+        self.retry_queue = RetryQueue(None)
+        if archive is not None:
+            self.archive = HtmlArchive(archive.directory, archive.segment_max_bytes, writer=worker_id)
 
-            return pd.DataFrame()
+        self.rate_limiter = work_queue
+        processed = 0
+
+        try:
+            while True:
+                job = work_queue.lease(worker_id, lease_seconds)
+                if job is None:
+                    counts = work_queue.counts()
+                    if counts["pending"] == 0 and counts["leased"] == 0:
+                        break
+                    # Other workers may still add jobs, or pending jobs are backing off
+                    time.sleep(poll_seconds)
+                    continue
+
+                if job["kind"] != "images" and self.driver is None:
+                    self.setup_driver()
+
+                try:
+                    succeeded = self._run_job(work_queue, job, mode)
+                except Exception as e:
+                    logger.error(f"Error running {job['kind']} job {job['id']}: {str(e)}")
+                    work_queue.fail(job, str(e))
+                    continue
+
+                if succeeded:
+                    work_queue.ack(job)
+                    processed += 1
+                else:
+                    work_queue.fail(job, "page could not be loaded")
+
+            logger.info(f"Worker {worker_id} finished after {processed} jobs: {work_queue.counts()}")
 
         finally:
-            try:
-                self.driver.quit()
-            except Exception as e:
-                logger.error(f"Error while closing the driver: {e}")
+            self.rate_limiter = None
+            self.retry_queue, self.archive = retry_queue, archive
+            self._close_driver()
+
+    def export_work_results(self, work_queue):
+        """Write the rows merged by all workers to one CSV."""
+        return self._save_listings(work_queue.results(), "merged")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,443 @@
+import re
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from funda_archive import HtmlArchive
+from funda_scraper import FundaScraper, VERIFICATION_PAGE_MARKER
+from funda_retry import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+# Smallest valid JPEG (1x1 px); padded to image_bytes to simulate real image sizes
+TINY_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f"
+    "141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432ffc0000b080001000101011100"
+    "ffc4001f0000010501010101010100000000000000000102030405060708090a0bffc400b5100002010303020403050504040000"
+    "017d01020300041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a25262728292a"
+    "3435363738393a434445464748494a535455565758595a636465666768696a737475767778797a838485868788898a9293949596"
+    "9798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2"
+    "f3f4f5f6f7f8f9faffda0008010100003f00fbd3ffd9"
+)
+
+SEARCH_PATH = re.compile(r"^/(?P<category>[^/]+)/(?P<city>[^/]+)/\+(?P<radius>[^/]+)/(?:p(?P<page>\d+)/)?$")
+DETAIL_PATH = re.compile(r"/object-(?P<listing_id>\d+)-")
+
+VERIFICATION_PAGE = f"<html><body><h1>{VERIFICATION_PAGE_MARKER}</h1></body></html>"
+
+
+def parse_latency(spec):
+    """
+    "fixed:0.2", "uniform:0.1:0.5" or "lognormal:0.3:0.6" (median seconds, sigma)
+    -> a function drawing one delay from a random.Random.
+    """
+    kind, *args = spec.split(":")
+    args = [float(arg) for arg in args]
+    if kind == "fixed":
+        return lambda rng: args[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+class SyntheticSite:
+    """
+    Generated search and listing pages with the markup FundaScraper parses, so the
+    expected result of a scrape is known exactly.
+    """
+
+    def __init__(self, categories, listings_per_category=45, per_page=15, images_per_listing=4,
+                 structured_data=True, seed=0):
+        self.categories = categories
+        self.per_page = per_page
+        self.images_per_listing = images_per_listing
+        self.structured_data = structured_data
+        rng = random.Random(seed)
+
+        self.listings = {}
+        self.by_category = {}
+        for cat_idx, category in enumerate(categories):
+            ids = []
+            for idx in range(listings_per_category):
+                listing_id = str(90000000 + cat_idx * 100000 + idx)
+                self.listings[listing_id] = {
+                    "listing_id": listing_id,
+                    "category": category,
+                    "title": f"Perceel {idx + 1}, Teststad",
+                    "price": rng.randrange(50, 2000) * 1000,
+                    "location": f"{rng.randrange(1000, 9999)} {rng.choice('ABCDEFGH')}{rng.choice('KLMNPRST')} Teststad",
+                    "url_path": f"/{category}/teststad/object-{listing_id}-perceel-{idx + 1}/",
+                    "plot_area_m2": rng.randrange(2000, 400000),
+                    "build_year": rng.randrange(1900, 2024) if cat_idx % 2 else None,
+                }
+                ids.append(listing_id)
+            self.by_category[category] = ids
+
+    def total_pages(self, category):
+        return max(1, -(-len(self.by_category.get(category, [])) // self.per_page))
+
+    def search_page(self, base, category, page):
+        ids = self.by_category.get(category)
+        if ids is None:
+            return None
+
+        page_ids = ids[(page - 1) * self.per_page:page * self.per_page]
+        results = []
+        items = []
+        for listing_id in page_ids:
+            listing = self.listings[listing_id]
+            results.append(
+                '<div class="search-result-main"><div class="search-result-content">'
+                '<div class="search-result-content-inner">'
+                f'<div class="search-result__header-title-col"><a href="{listing["url_path"]}">{listing["title"]}</a></div>'
+                f'<h4 class="search-result__header-subtitle">{category}</h4>'
+                f'<div class="search-result-info-price"><span>{self._price_text(listing)}</span></div>'
+                '</div></div></div>'
+            )
+            items.append({
+                "@type": "ListItem",
+                "url": listing["url_path"],
+                "name": listing["title"],
+                "offers": {
+                    "@type": "Offer",
+                    "price": listing["price"],
+                    "priceCurrency": "EUR",
+                    "businessFunction": "http://purl.org/goodrelations/v1#Sell",
+                },
+            })
+
+        pagination = "".join(
+            f'<a data-pagination-page="{number}" href="p{number}/">{number}</a>'
+            for number in range(1, self.total_pages(category) + 1)
+        )
+        return (
+            "<html><head>"
+            + self._json_ld({"@context": "https://schema.org", "@type": "ItemList", "itemListElement": items})
+            + "</head><body>"
+            + ("".join(results) or '<div class="search-no-results">Geen resultaten gevonden</div>')
+            + f'<div class="pagination-pages">{pagination}</div></body></html>'
+        )
+
+    def detail_page(self, base, listing_id):
+        listing = self.listings.get(listing_id)
+        if listing is None:
+            return None
+
+        images = "".join(
+            f'<img data-media-id="{listing_id}{idx}" src="{base}/cloud.funda.nl/valentina_media/{listing_id}_{idx}_360.jpg" '
+            f'srcset="{base}/cloud.funda.nl/valentina_media/{listing_id}_{idx}_180.jpg 180w, '
+            f'{base}/cloud.funda.nl/valentina_media/{listing_id}_{idx}_360.jpg 360w, '
+            f'{base}/cloud.funda.nl/valentina_media/{listing_id}_{idx}_1080.jpg 1080w">'
+            for idx in range(1, self.images_per_listing + 1)
+        )
+        postcode, place = listing["location"][:7], listing["location"][8:]
+        structured = self._json_ld({
+            "@context": "https://schema.org",
+            "@type": "Product",
+            "name": listing["title"],
+            "description": f"Testomschrijving voor {listing['title']}",
+            "offers": {"@type": "Offer", "price": listing["price"], "priceCurrency": "EUR"},
+            "address": {"@type": "PostalAddress", "postalCode": postcode, "addressLocality": place},
+        })
+        return (
+            f"<html><head>{structured}</head><body><div class=\"object-primary\">"
+            '<div class="object-header__content"><h1>'
+            f'<span class="object-header__title">{listing["title"]}</span>'
+            f'<span class="object-header__subtitle">{listing["location"]}</span></h1>'
+            f'<div class="object-header__pricing"><strong class="object-header__price">{self._price_text(listing)}</strong></div>'
+            "</div>"
+            '<section class="object-description"><div class="object-description-body">'
+            f"Testomschrijving voor {listing['title']}</div></section>"
+            '<div class="object-kenmerken-body">'
+            f"{self._bouw_section(listing)}"
+            '<h3>Kadastrale gegevens</h3><dl>'
+            f'<dt class="object-kenmerken-group-header"><div>TESTSTAD A {listing_id[-4:]}</div></dt>'
+            f'<dd><dl><dt>Oppervlakte</dt><dd>{self._cadastral_area(listing["plot_area_m2"])}</dd></dl></dd>'
+            f"</dl></div>{images}</div></body></html>"
+        )
+
+    def _bouw_section(self, listing):
+        if listing["build_year"] is None:
+            return ""
+        return f"<h3>Bouw</h3><dl><dt>Bouwjaar</dt><dd>{listing['build_year']}</dd></dl>"
+
+    def _cadastral_area(self, area_m2):
+        hectares, rest = divmod(area_m2, 10000)
+        ares, centiares = divmod(rest, 100)
+        return f"{hectares} ha {ares} a {centiares} ca"
+
+    def _price_text(self, listing):
+        return f"€ {listing['price']:,}".replace(",", ".") + " k.k."
+
+    def _json_ld(self, data):
+        if not self.structured_data:
+            return ""
+        return f'<script type="application/ld+json">{json.dumps(data)}</script>'
+
+    def expected(self, categories=None, n_pages=None):
+        """Listings a complete scrape of these categories (and page limit) should return."""
+        expected = {}
+        for category in categories or self.categories:
+            ids = self.by_category.get(category, [])
+            if n_pages is not None:
+                ids = ids[:n_pages * self.per_page]
+            for listing_id in ids:
+                expected[listing_id] = self.listings[listing_id]
+        return expected
+
+
+class RecordedSite:
+    """Pages replayed from an HtmlArchive, with links and images pointed at the stand-in."""
+
+    def __init__(self, archive_dir):
+        archive = HtmlArchive(archive_dir)
+        self.archive = archive
+        self.pages = {}
+        for entry in archive.entries():
+            # Later recordings of the same URL replace earlier ones
+            self.pages[urlsplit(entry["url"]).path] = entry
+
+    def _rewrite(self, html, base):
+        html = html.replace("https://www.fundainbusiness.nl", base)
+        return html.replace("https://cloud.funda.nl/", f"{base}/cloud.funda.nl/")
+
+    def search_page(self, base, path):
+        entry = self.pages.get(path)
+        return self._rewrite(self.archive.read(entry), base) if entry else None
+
+    detail_page = search_page
+
+    def expected(self, categories=None, n_pages=None):
+        return None
+
+
+class StandInServer:
+    """
+    Local HTTP stand-in for fundainbusiness.nl serving a SyntheticSite or RecordedSite.
+
+    Every page request first waits a delay drawn from `latency`; then, with the given
+    probabilities, it is answered with an HTTP 503 error page or the verification
+    page instead of the real page. Images are served as image_bytes of JPEG data.
+    """
+
+    def __init__(self, site, latency="fixed:0", error_rate=0.0, verification_rate=0.0,
+                 image_bytes=60000, seed=0, host="127.0.0.1", port=0):
+        self.site = site
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.verification_rate = verification_rate
+        self.image_body = TINY_JPEG[:-2] + b"\0" * max(0, image_bytes - len(TINY_JPEG)) + TINY_JPEG[-2:]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"search": 0, "detail": 0, "image": 0, "errors": 0, "verification": 0, "not_found": 0}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = None
+
+    def _draw(self):
+        with self.lock:
+            return self.latency(self.rng), self.rng.random(), self.rng.random()
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _handle(self, request):
+        path = urlsplit(request.path).path
+
+        if "/valentina_media/" in path:
+            self._count("image")
+            self._send(request, 200, self.image_body, "image/jpeg")
+            return
+
+        delay, error_draw, verification_draw = self._draw()
+        time.sleep(delay)
+
+        if error_draw < self.error_rate:
+            self._count("errors")
+            self._send(request, 503, b"<html><body>Service unavailable</body></html>")
+            return
+        if verification_draw < self.verification_rate:
+            self._count("verification")
+            self._send(request, 200, VERIFICATION_PAGE.encode("utf-8"))
+            return
+
+        html = None
+        search = SEARCH_PATH.match(path)
+        detail = DETAIL_PATH.search(path)
+        if detail:
+            self._count("detail")
+            if isinstance(self.site, SyntheticSite):
+                html = self.site.detail_page(self.base_url, detail.group("listing_id"))
+            else:
+                html = self.site.detail_page(self.base_url, path)
+        elif search:
+            self._count("search")
+            if isinstance(self.site, SyntheticSite):
+                html = self.site.search_page(self.base_url, search.group("category"), int(search.group("page") or 1))
+            else:
+                html = self.site.search_page(self.base_url, path)
+
+        if html is None:
+            self._count("not_found")
+            self._send(request, 404, b"<html><body>Not found</body></html>")
+            return
+
+        self._send(request, 200, html.encode("utf-8"))
+
+    def _send(self, request, status, body, content_type="text/html; charset=utf-8"):
+        try:
+            request.send_response(status)
+            request.send_header("Content-Type", content_type)
+            request.send_header("Content-Length", str(len(body)))
+            request.end_headers()
+            request.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="standin-server", daemon=True)
+        self.thread.start()
+        logger.info(f"Stand-in server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+def run_load_test(server, categories, n_pages=None, mode="full", output_dir=None, **scraper_options):
+    """
+    Run FundaScraper.scrape end to end against a running stand-in server and report
+    throughput, fetch latency percentiles, server counters and, for a synthetic site,
+    how many expected listings were found with the right price, category and location.
+    """
+    output_dir = output_dir or tempfile.mkdtemp(prefix="funda-loadtest-")
+    scraper_options.setdefault("request_delay", (0, 0))
+    scraper_options.setdefault("page_delay", (0, 0))
+    scraper_options.setdefault("image_categories", categories)
+
+    scraper = FundaScraper(
+        city="teststad",
+        radius="10km",
+        categories=categories,
+        output_dir=output_dir,
+        base_url=server.base_url,
+        start_driver=False,
+        **scraper_options
+    )
+    # Do not let an injected error burst stall the measurement for minutes
+    scraper.circuit_breaker = CircuitBreaker(cooldown_seconds=1, max_cooldown=5)
+
+    start = time.monotonic()
+    df = scraper.scrape(n_pages=n_pages, mode=mode)
+    elapsed = time.monotonic() - start
+
+    report = {
+        "listings": len(df),
+        "seconds": round(elapsed, 1),
+        "listings_per_minute": round(len(df) / elapsed * 60, 1) if elapsed else None,
+        "fetch_latency_p50": _percentile(scraper.fetch_latencies, 0.50),
+        "fetch_latency_p95": _percentile(scraper.fetch_latencies, 0.95),
+        "fetch_latency_p99": _percentile(scraper.fetch_latencies, 0.99),
+        "fetches": len(scraper.fetch_latencies),
+        "retry_queue": len(scraper.retry_queue),
+        "server": dict(server.stats),
+        "output_dir": output_dir,
+    }
+
+    expected = server.site.expected(categories, n_pages)
+    if expected is not None:
+        found = {str(row["listing_id"]): row for row in df.to_dict("records")} if len(df) else {}
+        digits = lambda text: re.sub(r"\D", "", str(text or ""))
+        correct = sum(
+            1 for listing_id, listing in expected.items()
+            if listing_id in found
+            and digits(found[listing_id]["price"]) == str(listing["price"])
+            and found[listing_id]["category"] == listing["category"]
+            and (mode == "search-only" or found[listing_id]["location"] == listing["location"])
+        )
+        report.update({
+            "expected": len(expected),
+            "missing": len(set(expected) - set(found)),
+            "unexpected": len(set(found) - set(expected)),
+            "correct": correct,
+        })
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run FundaScraper against a local stand-in server")
+    parser.add_argument("--archive-dir", default=None, help="replay recorded pages instead of a synthetic site")
+    parser.add_argument("--categories", nargs="+", default=["agrarische-grond", "agrarisch-bedrijf"])
+    parser.add_argument("--listings", type=int, default=45, help="synthetic listings per category")
+    parser.add_argument("--per-page", type=int, default=15, help="synthetic listings per search page")
+    parser.add_argument("--pages", type=int, default=None, help="maximum pages per category to scrape")
+    parser.add_argument("--no-structured-data", action="store_true", help="synthetic pages without JSON-LD")
+    parser.add_argument("--latency", default="lognormal:0.2:0.5", help="fixed:S, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--verification-rate", type=float, default=0.0)
+    parser.add_argument("--image-bytes", type=int, default=60000)
+    parser.add_argument("--mode", default="full")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve-only", action="store_true", help="only run the server")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.archive_dir:
+        site = RecordedSite(args.archive_dir)
+    else:
+        site = SyntheticSite(
+            args.categories,
+            listings_per_category=args.listings,
+            per_page=args.per_page,
+            structured_data=not args.no_structured_data,
+            seed=args.seed
+        )
+
+    standin = StandInServer(
+        site,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        verification_rate=args.verification_rate,
+        image_bytes=args.image_bytes,
+        seed=args.seed,
+        port=args.port
+    ).start()
+
+    try:
+        if args.serve_only:
+            standin.thread.join()
+        else:
+            print(json.dumps(run_load_test(standin, args.categories, n_pages=args.pages, mode=args.mode), indent=2))
+    finally:
+        standin.stop()
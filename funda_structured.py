@@ -0,0 +1,239 @@
+import re
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # optional, only makes decoding faster
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Schema.org types that can describe the listing itself
+LISTING_TYPES = {
+    "Product", "Offer", "AggregateOffer", "RealEstateListing", "Place", "Accommodation",
+    "Residence", "House", "SingleFamilyResidence", "Apartment",
+}
+
+# Brokers and other parties; their address and description are never the listing's
+PARTY_TYPES = {"Organization", "LocalBusiness", "RealEstateAgent", "Corporation", "Person", "Brand"}
+
+# UN/CEFACT unit codes used in schema.org price specifications
+UNIT_SUFFIXES = {"MON": "/mnd", "ANN": "/jr", "MTK": "/m²"}
+
+# window.__NUXT__ = {...}; style state assignments in inline scripts
+STATE_ASSIGNMENT = re.compile(r"^\s*window\.(__\w+__)\s*=\s*(\{.*\})\s*;?\s*$", re.DOTALL)
+
+
+def load_json(text):
+    # orjson only accepts exact str, not bs4's NavigableString subclass
+    return orjson.loads(str(text)) if orjson is not None else json.loads(text)
+
+
+def iter_embedded_json(soup):
+    """
+    Yield (source, data) for every JSON document embedded in the page:
+    "json-ld" for <script type="application/ld+json">, "embedded-state" for
+    <script type="application/json"> and window.__STATE__ = {...} assignments.
+    """
+    for script in soup.find_all("script"):
+        script_type = (script.get("type") or "").lower()
+        text = script.string or script.get_text()
+        if not text or not text.strip():
+            continue
+
+        if script_type == "application/ld+json":
+            source, payload = "json-ld", text
+        elif script_type == "application/json":
+            source, payload = "embedded-state", text
+        else:
+            match = STATE_ASSIGNMENT.match(text)
+            if not match:
+                continue
+            source, payload = "embedded-state", match.group(2)
+
+        try:
+            yield source, load_json(payload)
+        except ValueError as e:
+            logger.debug(f"Skipping unparsable {source} script: {e}")
+
+
+def iter_typed_objects(data, prune=()):
+    """
+    Every dict with a schema.org "@type" anywhere in a decoded JSON document.
+    Objects of a type in prune are skipped together with everything inside them.
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if "@type" in item:
+                if _types(item) & set(prune):
+                    continue
+                yield item
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+
+
+def _types(obj):
+    types = obj.get("@type")
+    return set(types) if isinstance(types, list) else {types}
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    return value or None
+
+
+def _first_offer(offers):
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    return offers if isinstance(offers, dict) else None
+
+
+def price_unit(offers):
+    """
+    The unit a schema.org price is quoted in, as the site writes it ("/mnd", "/jr",
+    "/m²/jr"), "" for an explicit sale, or None when the data does not say.
+    """
+    offers = _first_offer(offers)
+    if offers is None:
+        return None
+
+    specification = offers.get("priceSpecification")
+    specification = specification if isinstance(specification, dict) else {}
+
+    unit_text = specification.get("unitText") or offers.get("unitText")
+    if unit_text:
+        unit_text = _text(unit_text)
+        return unit_text if unit_text.startswith("/") else f"/{unit_text}"
+
+    suffix = ""
+    reference = specification.get("referenceQuantity")
+    if isinstance(reference, dict):
+        suffix += UNIT_SUFFIXES.get(reference.get("unitCode"), "")
+    suffix += UNIT_SUFFIXES.get(specification.get("unitCode") or offers.get("unitCode"), "")
+    if suffix:
+        return suffix
+
+    if str(offers.get("businessFunction", "")).endswith("Sell"):
+        return ""
+    return None
+
+
+def format_price(offers):
+    """
+    Schema.org offers -> "€ 250.000", or "€ 1.500 /mnd" when the price has a unit;
+    strings are passed through as the site wrote them.
+    """
+    offers = _first_offer(offers)
+    if offers is None:
+        return None
+
+    price = offers.get("price")
+    if price is None and isinstance(offers.get("priceSpecification"), dict):
+        price = offers["priceSpecification"].get("price")
+    if price is None:
+        return None
+
+    try:
+        amount = float(price)
+    except (TypeError, ValueError):
+        return _text(price)
+
+    currency = offers.get("priceCurrency") or "EUR"
+    symbol = "€" if currency == "EUR" else currency
+    unit = price_unit(offers)
+    return f"{symbol} {amount:,.0f}".replace(",", ".") + (f" {unit}" if unit else "")
+
+
+def format_location(address):
+    """Schema.org PostalAddress -> "5541 SK Reusel", like the detail page subtitle."""
+    if isinstance(address, str):
+        return _text(address)
+    if not isinstance(address, dict):
+        return None
+    parts = [address.get("postalCode"), address.get("addressLocality")]
+    return _text(" ".join(str(part) for part in parts if part))
+
+
+def extract_detail_fields(soup):
+    """
+    Listing fields decoded from the page's structured data.
+
+    Only objects of a LISTING_TYPES type are read. Returns (fields, sources): fields
+    holds price, location and description where found; sources maps each of them
+    to "json-ld" or "embedded-state".
+    """
+    fields = {}
+    sources = {}
+    # Related-listing carousels are ItemLists; their offers are not this listing's
+    prune = ("ItemList", "BreadcrumbList") + tuple(PARTY_TYPES)
+
+    for source, data in iter_embedded_json(soup):
+        for obj in iter_typed_objects(data, prune=prune):
+            types = _types(obj)
+            if not types & LISTING_TYPES:
+                continue
+            if not ("offers" in obj or "address" in obj or "price" in obj):
+                continue
+
+            offers = obj.get("offers") if "offers" in obj else (obj if types & {"Offer", "AggregateOffer"} else None)
+            candidates = {
+                "price": format_price(offers),
+                "location": format_location(obj.get("address")),
+                "description": _text(obj.get("description")),
+            }
+            for field, value in candidates.items():
+                if value and field not in fields:
+                    fields[field] = value
+                    sources[field] = source
+
+    return fields, sources
+
+
+def extract_search_items(soup, base_url):
+    """
+    Search cards from an ItemList in the page's structured data, keyed by URL.
+    Each item has url and, where present, title and price, plus a sources dict.
+    Prices are only taken when the data says what they are quoted in (see price_unit);
+    a bare number could be a sale price or a rent.
+    """
+    items = {}
+
+    for source, data in iter_embedded_json(soup):
+        for obj in iter_typed_objects(data):
+            if "ItemList" not in _types(obj):
+                continue
+
+            for element in obj.get("itemListElement") or []:
+                if not isinstance(element, dict):
+                    continue
+                item = element.get("item") if isinstance(element.get("item"), dict) else element
+
+                url = item.get("url") or element.get("url")
+                if not url:
+                    continue
+                if not url.startswith("http"):
+                    url = f"{base_url}{url}"
+
+                card = {"url": url}
+                sources = {"url": source}
+
+                title = _text(item.get("name"))
+                if title:
+                    card["title"] = title
+                    sources["title"] = source
+
+                price = format_price(item.get("offers")) if price_unit(item.get("offers")) is not None else None
+                if price:
+                    card["price"] = price
+                    sources["price"] = source
+
+                card["sources"] = sources
+                items.setdefault(url, card)
+
+    return items
@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import argparse
+from contextlib import contextmanager
+from funda_scraper import FundaScraper, DEFAULT_OUTPUT_DIR
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("search", "detail", "images")
+
+
+class WorkQueue:
+    """
+    Interface for the shared queue that several scraper workers drain together.
+
+    A job is a dict with id, kind ("search", "detail" or "images"), payload and
+    lease_token. Workers lease a job, then ack it when done or fail it to have it
+    retried later; a lease that is not acked in time expires and the job becomes
+    available to other workers again. The queue also holds the merged result rows
+    and the global rate limit. A networked queue only needs to implement these methods.
+    """
+
+    def put(self, kind, key, payload):
+        """Add a job unless a job with the same kind and key already exists."""
+        raise NotImplementedError
+
+    def lease(self, worker_id, lease_seconds=600):
+        """Claim the next available job, or return None."""
+        raise NotImplementedError
+
+    def ack(self, job):
+        raise NotImplementedError
+
+    def fail(self, job, error, retry_delay=300):
+        """
+        Make the job available again after retry_delay seconds, doubled for every
+        earlier attempt, or mark it failed once it has used up its attempts.
+        """
+        raise NotImplementedError
+
+    def counts(self):
+        """Number of jobs per status (pending, leased, done, failed)."""
+        raise NotImplementedError
+
+    def merge_result(self, listing_id, fields):
+        """Create or update the output row for a listing."""
+        raise NotImplementedError
+
+    def results(self):
+        raise NotImplementedError
+
+    def wait_for_slot(self):
+        """Block until the global rate limit allows another fetch."""
+        raise NotImplementedError
+
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    WorkQueue stored in one SQLite file on a local disk, shared by the worker
+    processes on that machine. SQLite's file locking is not reliable on network
+    filesystems, so do not share the file between machines over NFS/SMB.
+
+    min_interval is the minimum number of seconds between two fetches across all
+    workers. Jobs are given up after max_attempts failures.
+    """
+
+    def __init__(self, path, min_interval=3.0, max_attempts=5):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+
+        with self._transaction() as db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    job_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL DEFAULT 0,
+                    lease_token TEXT,
+                    lease_expires_at REAL,
+                    worker_id TEXT,
+                    last_error TEXT,
+                    UNIQUE (kind, job_key)
+                )
+                """
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results (listing_id TEXT PRIMARY KEY, row TEXT NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit (id INTEGER PRIMARY KEY CHECK (id = 1), next_at REAL NOT NULL)"
+            )
+            db.execute("INSERT OR IGNORE INTO rate_limit (id, next_at) VALUES (1, 0)")
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can never
+        # lease the same job or reserve the same rate-limit slot
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def put(self, kind, key, payload):
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}, expected one of {JOB_KINDS}")
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO jobs (kind, job_key, payload) VALUES (?, ?, ?)",
+                (kind, str(key), json.dumps(payload, ensure_ascii=False))
+            )
+
+    def lease(self, worker_id, lease_seconds=600):
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                """
+                SELECT * FROM jobs
+                WHERE (status = 'pending' AND available_at <= ?)
+                   OR (status = 'leased' AND lease_expires_at < ?)
+                ORDER BY
+                    CASE kind WHEN 'search' THEN 0 WHEN 'detail' THEN 1 ELSE 2 END,
+                    id
+                LIMIT 1
+                """,
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            if row["status"] == "leased":
+                logger.warning(f"Lease of job {row['id']} by {row['worker_id']} expired, re-leasing it")
+
+            token = uuid.uuid4().hex
+            db.execute(
+                "UPDATE jobs SET status = 'leased', lease_token = ?, lease_expires_at = ?, worker_id = ? WHERE id = ?",
+                (token, now + lease_seconds, worker_id, row["id"])
+            )
+
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "lease_token": token,
+        }
+
+    def ack(self, job):
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE jobs SET status = 'done', lease_token = NULL WHERE id = ? AND lease_token = ?",
+                (job["id"], job["lease_token"])
+            ).rowcount
+        if not updated:
+            logger.warning(f"Job {job['id']} was acked after its lease was taken over")
+
+    def fail(self, job, error, retry_delay=300):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND lease_token = ?",
+                (job["id"], job["lease_token"])
+            ).fetchone()
+            if row is None:
+                return
+
+            attempts = row["attempts"] + 1
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            db.execute(
+                """
+                UPDATE jobs
+                SET status = ?, attempts = ?, available_at = ?, last_error = ?, lease_token = NULL
+                WHERE id = ?
+                """,
+                (status, attempts, time.time() + retry_delay * 2 ** (attempts - 1), error, job["id"])
+            )
+
+        if status == "failed":
+            logger.warning(f"Giving up on {job['kind']} job {job['id']} after {attempts} attempts: {error}")
+
+    def counts(self):
+        rows = self.connection.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def merge_result(self, listing_id, fields):
+        with self._transaction() as db:
+            row = db.execute("SELECT row FROM results WHERE listing_id = ?", (str(listing_id),)).fetchone()
+            merged = json.loads(row["row"]) if row else {}
+            merged.update(fields)
+            db.execute(
+                "INSERT OR REPLACE INTO results (listing_id, row) VALUES (?, ?)",
+                (str(listing_id), json.dumps(merged, ensure_ascii=False))
+            )
+
+    def results(self):
+        rows = self.connection.execute("SELECT row FROM results ORDER BY listing_id").fetchall()
+        return [json.loads(row["row"]) for row in rows]
+
+    def wait_for_slot(self):
+        # Reserve the next free slot, then sleep until it arrives outside the transaction
+        with self._transaction() as db:
+            now = time.time()
+            next_at = db.execute("SELECT next_at FROM rate_limit WHERE id = 1").fetchone()["next_at"]
+            slot = max(now, next_at)
+            db.execute("UPDATE rate_limit SET next_at = ? WHERE id = 1", (slot + self.min_interval,))
+
+        if slot > now:
+            time.sleep(slot - now)
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Share one Funda scrape across several workers")
+    parser.add_argument("command", choices=["seed", "work", "export", "status"])
+    parser.add_argument("--queue", required=True, help="path to the SQLite queue file")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--city", default="den-bosch")
+    parser.add_argument("--radius", default="50km")
+    parser.add_argument("--categories", nargs="+", default=None)
+    parser.add_argument("--pages", type=int, default=None, help="maximum pages per category")
+    parser.add_argument("--mode", default="full", help="full or search-only")
+    parser.add_argument("--min-interval", type=float, default=3.0, help="seconds between fetches across all workers")
+    args = parser.parse_args()
+
+    work_queue = SqliteWorkQueue(args.queue, min_interval=args.min_interval)
+
+    if args.command == "status":
+        print(work_queue.counts())
+    else:
+        scraper = FundaScraper(
+            city=args.city,
+            radius=args.radius,
+            categories=args.categories,
+            output_dir=args.output_dir,
+            start_driver=False
+        )
+        if args.command == "seed":
+            scraper.enqueue_search_jobs(work_queue, n_pages=args.pages)
+        elif args.command == "work":
+            scraper.run_worker(work_queue, mode=args.mode, worker_id=f"{socket.gethostname()}-{os.getpid()}")
+        else:
+            scraper.export_work_results(work_queue)
+
+    work_queue.close()
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from funda_comparables import ComparablesIndex, normalize_legacy_columns
+from funda_parsing import parse_price
+
+
+# One real value of every price form in the exported funda_listings_*.csv files
+# (price, Overdracht_Vraagprijs and Overdracht_Huurprijs columns)
+@pytest.mark.parametrize("text, expected", [
+    ("€ 999.000 k.k.", 999000),
+    ("€ 1.000.000 kosten koper", 1000000),
+    ("€ 1.395.000 kosten koper (bouwrente van toepassing)", 1395000),
+    ("€ 979.800 v.o.n.", 979800),
+    ("vanaf € 139.500 v.o.n.", 139500),
+    ("€ 1.191.850 vrij op naam", 1191850),
+    ("€ 425.000 vrij op naam (bouwrente van toepassing)", 425000),
+    ("€ 99.500 /jr", None),
+    ("€ 10.000 per jaar", None),
+    ("€ 999 /mnd", None),
+    ("€ 1.000 per maand", None),
+    ("€ 100 /m²/jaar", None),
+    ("vanaf € 94 /m²/jaar", None),
+    ("€ 99 per vierkante meter per jaar", None),
+    ("Huurprijs op aanvraag", None),
+    ("huurprijs op aanvraag", None),
+    ("Huurprijs nader overeen te komen", None),
+    ("Prijs op aanvraag", None),
+    ("Prijs nader overeen te komen", None),
+    ("Prijs n.o.t.k.", None),
+    ("Verkoop bij inschrijving", None),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_legacy_columns_are_mapped():
+    legacy = pd.DataFrame({
+        "listing_id": ["1", "2"],
+        "url": [
+            "https://www.fundainbusiness.nl/agrarische-grond/neer/object-1-schooldijk/",
+            "https://www.fundainbusiness.nl/bedrijfshal/oss/object-2-weg/",
+        ],
+        "category": ["Losse grond", "Bedrijfshal"],
+        "price": ["€ 250.000 k.k.", "€ 24.000 /jr"],
+        "scraped_date": ["2025-06-10 10:43:52", None],
+        "initial_scraped_date": [None, "2025-06-11 09:00:00"],
+        "Oppervlakten_Totale oppervlakte": ["2 ha 50 a", None],
+        "Oppervlakten_Perceel": [None, "5.320 m²"],
+        "Woonruimte_Bouwjaar": [None, "1.112 m³"],
+        "Bouw_Bouwperiode": [None, "1971-1980"],
+    })
+
+    mapped = normalize_legacy_columns(legacy)
+    assert mapped["source_category"].tolist() == ["agrarische-grond", "bedrijfshal"]
+    assert mapped["scraped_at"].tolist() == ["2025-06-10 10:43:52", "2025-06-11 09:00:00"]
+    assert mapped["plot_area_m2"].tolist() == [25000, 5320]
+    assert mapped["build_year"].tolist()[1] == 1975
+
+    result = ComparablesIndex.from_listings(legacy).query(category="agrarische-grond", plot_area_m2=20000)
+    assert result["listing_id"].tolist() == ["1"]
+    assert result["price_per_m2"].tolist() == [10.0]
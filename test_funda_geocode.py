@@ -0,0 +1,17 @@
+import pandas as pd
+
+from funda_geocode import PostcodeIndex
+
+
+def test_pc4_areas_fall_back_to_their_pc6_mean_in_a_mixed_table():
+    index = PostcodeIndex(
+        ["5541SK", "5541AB", "5541", "1234AA", "1234AB"],
+        [51.0, 51.2, 52.0, 10.0, 12.0],
+        [5.0, 5.0, 6.0, 1.0, 3.0],
+    )
+
+    result = index.geocode(pd.Series(["5541 ZZ Reusel", "1234 ZZ Teststad", "1234 AA Teststad", "9999 Elders"]))
+
+    # 5541 has its own PC4 row; 1234 only has PC6 rows
+    assert result[["latitude", "longitude"]].values.tolist()[:3] == [[52.0, 6.0], [11.0, 2.0], [10.0, 1.0]]
+    assert result["geocode_precision"].tolist() == ["pc4", "pc4", "pc6", None]
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from funda_work_queue import SqliteWorkQueue
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "scrape.db")
+
+
+def test_leases_never_return_the_same_job(queue_path):
+    setup = SqliteWorkQueue(queue_path)
+    for idx in range(40):
+        setup.put("detail", idx, {"idx": idx})
+
+    leased = {"a": [], "b": []}
+
+    def drain(worker_id):
+        # One connection per worker, as with separate worker processes
+        queue = SqliteWorkQueue(queue_path)
+        while True:
+            job = queue.lease(worker_id)
+            if job is None:
+                break
+            leased[worker_id].append(job["id"])
+        queue.close()
+
+    workers = [threading.Thread(target=drain, args=(worker_id,)) for worker_id in leased]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    all_ids = leased["a"] + leased["b"]
+    assert len(all_ids) == len(set(all_ids)) == 40
+    assert setup.counts()["leased"] == 40
+
+
+def test_expired_lease_is_leased_again(queue_path):
+    queue = SqliteWorkQueue(queue_path)
+    queue.put("search", "den-bosch/50km/agrarische-grond/1", {"page_num": 1})
+
+    first = queue.lease("a", lease_seconds=-1)
+    second = queue.lease("b")
+
+    assert second["id"] == first["id"]
+    assert second["lease_token"] != first["lease_token"]
+    assert queue.lease("c") is None
+
+
+def test_ack_and_fail_with_a_stale_token_are_ignored(queue_path):
+    queue = SqliteWorkQueue(queue_path)
+    queue.put("detail", "43912345", {})
+
+    stale = queue.lease("a", lease_seconds=-1)
+    current = queue.lease("b")
+
+    queue.ack(stale)
+    queue.fail(stale, "timeout", retry_delay=0)
+    assert queue.counts() == {"pending": 0, "leased": 1, "done": 0, "failed": 0}
+
+    queue.ack(current)
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 1, "failed": 0}
+
+
+def test_job_fails_after_max_attempts(queue_path):
+    queue = SqliteWorkQueue(queue_path, max_attempts=3)
+    queue.put("images", "43912345", {})
+
+    for attempt in range(3):
+        job = queue.lease("a")
+        assert job is not None, f"job not available for attempt {attempt + 1}"
+        queue.fail(job, "no image could be downloaded", retry_delay=0)
+
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 0, "failed": 1}
+    assert queue.lease("a") is None
+
+
+def test_failed_job_waits_for_its_retry_delay(queue_path):
+    queue = SqliteWorkQueue(queue_path)
+    queue.put("detail", "43912345", {})
+
+    queue.fail(queue.lease("a"), "timeout", retry_delay=60)
+
+    assert queue.counts()["pending"] == 1
+    assert queue.lease("a") is None
+
+
+def test_wait_for_slot_spaces_fetches_across_workers(queue_path):
+    SqliteWorkQueue(queue_path).close()
+    slots = []
+
+    def fetch():
+        queue = SqliteWorkQueue(queue_path, min_interval=0.2)
+        queue.wait_for_slot()
+        slots.append(time.time())
+        queue.close()
+
+    start = time.time()
+    workers = [threading.Thread(target=fetch) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    slots.sort()
+    assert slots[-1] - start >= 0.6 - 0.05
+    assert all(later - earlier >= 0.2 - 0.05 for earlier, later in zip(slots, slots[1:]))